@@ -1,135 +1,207 @@
+"""
+Convert a 2025hop scouting-app export (all_matches_quals_only.csv) into match_scouting records.
+
+Columns are mapped a chunk at a time with pandas/numpy: counts become int arrays, branch
+placements are built as packed masks from the L2-L4 count columns (the first N branches of
+each level are marked filled) and expanded once per distinct mask. Records are streamed to
+the output as NDJSON (one record per line) or as one compact JSON array, so a whole season
+never has to sit in memory as dicts.
+
+    python converter.py                                  # -> ../DEMOBACKEND/converted_matches.json
+    python converter.py seasons/*.csv -f ndjson -o ../DEMOBACKEND/converted_matches.ndjson
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import orjson
 import pandas as pd
-import json
+
+# Branch layout is shared with the backend (DEMOBACKEND/calculators/Branch_Bitmask.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "DEMOBACKEND"))
+from calculators.Branch_Bitmask import LANE_BITS, decode_branches
 
 # === Constants ===
-coral_keys = list("ABCDEFGHIJKL")
 algae_lanes = ["AB", "CD", "EF", "GH", "IJ", "KL"]
-
-
-# === Helper functions ===
-def safe_int(val):
-    try:
-        return int(val)
-    except (ValueError, TypeError):
-        return 0
-
-
-def safe_float(val):
-    try:
-        return float(val)
-    except (ValueError, TypeError):
-        return 0.0
-
-
-def generate_branch_map(l2, l3, l4):
-    """Assign the correct number of trues independently for each level."""
-    branch = {k: {"l2": False, "l3": False, "l4": False} for k in coral_keys}
-
-    # For each level, assign the first N keys as true.
-    for i in range(min(l2, len(coral_keys))):
-        branch[coral_keys[i]]["l2"] = True
-
-    for i in range(min(l3, len(coral_keys))):
-        branch[coral_keys[i]]["l3"] = True
-
-    for i in range(min(l4, len(coral_keys))):
-        branch[coral_keys[i]]["l4"] = True
-
-    return branch
-
-
-def parse_row(row):
-    if row["Pre Match.match_type"] == "Practice" or row["Pre Match.match_type"] == "playoff":
-        return None
-
-    team = safe_int(row["Pre Match.teamNum"])
-    match_num = safe_int(row["Pre Match.match_num"])
-    match_type = "qm" if row["Pre Match.match_type"] == "Qualification" else row["Pre Match.match_type"].lower()
-    alliance = "red" if "red" in row["Pre Match.allianceColor"].lower() else "blue"
-
-    # Auto phase
-    auto_branch = generate_branch_map(
-        l2=safe_int(row.get("Auton.autonCoral L2")),
-        l3=safe_int(row.get("Auton.autonCoral L3")),
-        l4=safe_int(row.get("Auton.autonCoral L4"))
+PACK_BRANCHES = False  # emit branchPlacement as a packed int (layout: DEMOBACKEND/calculators/Branch_Bitmask.py)
+SKIPPED_MATCH_TYPES = ("Practice", "playoff")
+CHUNK_ROWS = 50_000
+
+INPUT = "all_matches_quals_only.csv"
+OUTPUTS = {"json": "../DEMOBACKEND/converted_matches.json", "ndjson": "../DEMOBACKEND/converted_matches.ndjson"}
+
+PHASE_COLUMNS = {
+    "auto": {
+        "branches": ("Auton.autonCoral L2", "Auton.autonCoral L3", "Auton.autonCoral L4"),
+        "missed": "Auton.autonCoralMissed",
+        "l1": "Auton.autonCoral L1",
+        "processor": "Auton.autonProc",
+        "barge": "Auton.autonNet",
+    },
+    "teleop": {
+        "branches": ("Match.matchCoral L2", "Match.matchCoral L3", "Match.matchCoral L4"),
+        "missed": "Match.matchCoralMissed",
+        "l1": "Match.matchCoral L1",
+        "processor": "Match.matchProc",
+        "barge": "Match.matchNet",
+    },
+}
+
+
+# === Column helpers (missing columns and unparseable cells read as 0 / "") ===
+def int_column(df, name):
+    if name not in df:
+        return np.zeros(len(df), dtype=np.int64)
+    values = pd.to_numeric(df[name], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    return np.trunc(values).astype(np.int64)
+
+
+def float_column(df, name):
+    if name not in df:
+        return np.zeros(len(df), dtype=np.float64)
+    return pd.to_numeric(df[name], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+
+
+def text_column(df, name):
+    if name not in df:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[name].astype(object).where(df[name].notna(), "").astype(str).str.strip()
+
+
+def yes_column(df, name, value="yes"):
+    return (text_column(df, name).str.lower() == value).to_numpy()
+
+
+def branch_masks(l2, l3, l4):
+    """Packed branchPlacement per row: the first N bits of each 12-bit level lane are set."""
+    counts = np.clip(np.stack([l2, l3, l4], axis=1), 0, LANE_BITS)
+    lanes = ((np.int64(1) << counts) - 1) << (np.arange(3, dtype=np.int64) * LANE_BITS)
+    return np.bitwise_or.reduce(lanes, axis=1)
+
+
+# === Conversion ===
+def convert_frame(df):
+    """
+    Yield match_scouting records for one export chunk (practice and playoff rows dropped).
+    Records with the same branch counts share their branchPlacement dict, and all records
+    share algaePlacement/faults; copy before mutating.
+    """
+    df = df[~df["Pre Match.match_type"].isin(SKIPPED_MATCH_TYPES)]
+    if df.empty:
+        return
+
+    types = df["Pre Match.match_type"].astype(str)
+    match_type = np.where(types == "Qualification", "qm", types.str.lower())
+    alliance = np.where(text_column(df, "Pre Match.allianceColor").str.lower().str.contains("red"), "red", "blue")
+    team = int_column(df, "Pre Match.teamNum").tolist()
+    match_num = int_column(df, "Pre Match.match_num").tolist()
+    scouter = text_column(df, "scouter.name").tolist()
+
+    algae = {lane: True for lane in algae_lanes}
+    phases = {}
+    for phase, cols in PHASE_COLUMNS.items():
+        masks = branch_masks(*(int_column(df, c) for c in cols["branches"]))
+        if PACK_BRANCHES:
+            placements = masks.tolist()
+        else:
+            maps = {m: decode_branches(m) for m in np.unique(masks).tolist()}
+            placements = [maps[m] for m in masks.tolist()]
+        phases[phase] = zip(
+            placements,
+            int_column(df, cols["missed"]).tolist(),
+            int_column(df, cols["l1"]).tolist(),
+            int_column(df, cols["processor"]).tolist(),
+            int_column(df, cols["barge"]).tolist(),
+        )
+    moved = yes_column(df, "Auton.autonLeave").tolist()
+
+    defense = text_column(df, "Post Match.Defense").str.lower()
+    postmatch = zip(
+        (float_column(df, "Post Match.driverSkill") / 5).tolist(),
+        (float_column(df, "Post Match.robotSpeed") / 5).tolist(),
+        yes_column(df, "Endgame.climbSuccess").tolist(),
+        (defense == "no").tolist(),
+        (defense == "yes").tolist(),
+        text_column(df, "Post Match.comments").tolist(),
     )
-
-    # Teleop phase
-    teleop_branch = generate_branch_map(
-        l2=safe_int(row.get("Match.matchCoral L2")),
-        l3=safe_int(row.get("Match.matchCoral L3")),
-        l4=safe_int(row.get("Match.matchCoral L4"))
-    )
-
-    auto = {
-        "branchPlacement": auto_branch,
-        "algaePlacement": {lane: True for lane in algae_lanes},
-        "missed": {
-            "l1": 0,
-            "l2": 0,
-            "l3": 0,
-            "l4": safe_int(row.get("Auton.autonCoralMissed"))
-        },
-        "l1": safe_int(row.get("Auton.autonCoral L1")),
-        "processor": safe_int(row.get("Auton.autonProc")),
-        "barge": safe_int(row.get("Auton.autonNet")),
-        "missAlgae": 0,
-        "moved": str(row.get("Auton.autonLeave", "")).strip().lower() == "yes"
-    }
-
-    teleop = {
-        "branchPlacement": teleop_branch,
-        "algaePlacement": {lane: True for lane in algae_lanes},
-        "missed": {
-            "l1": 0,
-            "l2": 0,
-            "l3": 0,
-            "l4": safe_int(row.get("Match.matchCoralMissed"))
-        },
-        "l1": safe_int(row.get("Match.matchCoral L1")),
-        "processor": safe_int(row.get("Match.matchProc")),
-        "barge": safe_int(row.get("Match.matchNet")),
-        "missAlgae": 0,
-        "moved": True
-    }
-
-    postmatch = {
-        "skill": safe_float(row.get("Post Match.driverSkill")) / 5,
-        "climbSpeed": safe_float(row.get("Post Match.robotSpeed")) / 5,
-        "climbSuccess": str(row.get("Endgame.climbSuccess", "")).strip().lower() == "yes",
-        "offense": str(row.get("Post Match.Defense", "")).strip().lower() == "no",
-        "defense": str(row.get("Post Match.Defense", "")).strip().lower() == "yes",
-        "faults": {
-            "system": False,
-            "idle": False,
-            "other": False
-        },
-        "notes": str(row.get("Post Match.comments", "")).strip()
-    }
-
-    return {
-        "match": match_num,
-        "match_type": match_type,
-        "team": team,
-        "alliance": alliance,
-        "status": "submitted",
-        "scouter": str(row.get("scouter.name", "")).strip(),
-        "last_modified": "",
-        "data": {
-            "auto": auto,
-            "teleop": teleop,
-            "postmatch": postmatch
+    faults = {"system": False, "idle": False, "other": False}
+
+    def phase_record(placement, missed, l1, processor, barge, moved):
+        return {
+            "branchPlacement": placement,
+            "algaePlacement": algae,
+            "missed": {"l1": 0, "l2": 0, "l3": 0, "l4": missed},
+            "l1": l1,
+            "processor": processor,
+            "barge": barge,
+            "missAlgae": 0,
+            "moved": moved,
         }
-    }
 
+    for row in zip(match_num, match_type.tolist(), team, alliance.tolist(), scouter,
+                   phases["auto"], phases["teleop"], moved, postmatch):
+        m, mtype, t, a, s, auto, teleop, auto_moved, post = row
+        skill, speed, climbed, offense, defends, notes = post
+        yield {
+            "match": m,
+            "match_type": mtype,
+            "team": t,
+            "alliance": a,
+            "status": "submitted",
+            "scouter": s,
+            "last_modified": "",
+            "data": {
+                "auto": phase_record(*auto, auto_moved),
+                "teleop": phase_record(*teleop, True),
+                "postmatch": {
+                    "skill": skill,
+                    "climbSpeed": speed,
+                    "climbSuccess": climbed,
+                    "offense": offense,
+                    "defense": defends,
+                    "faults": faults,
+                    "notes": notes,
+                },
+            },
+        }
 
-# === Load CSV and convert ===
-df = pd.read_csv("all_matches_quals_only.csv")
-converted = [
-    parsed for _, row in df.iterrows()
-    if (parsed := parse_row(row)) is not None
-]
 
-# === Export JSON ===
-with open("../DEMOBACKEND/converted_matches.json", "w", encoding="utf-8") as f:
-    json.dump(converted, f, indent=2)
+def convert_csv(paths, chunk_rows=CHUNK_ROWS):
+    """Yield records from one or more exports, reading each in chunks of `chunk_rows`."""
+    for path in paths:
+        for chunk in pd.read_csv(path, chunksize=chunk_rows):
+            yield from convert_frame(chunk)
+
+
+def write_records(records, path, fmt="json"):
+    """Stream records to `path` as NDJSON or a compact JSON array. Returns the record count."""
+    count = 0
+    with open(path, "wb") as f:
+        if fmt == "ndjson":
+            for count, record in enumerate(records, 1):
+                f.write(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE))
+        else:
+            f.write(b"[")
+            for count, record in enumerate(records, 1):
+                if count > 1:
+                    f.write(b",")
+                f.write(orjson.dumps(record))
+            f.write(b"]")
+    return count
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert 2025hop scouting exports to match_scouting records.")
+    parser.add_argument("inputs", nargs="*", default=[INPUT], help=f"export CSV files (default: {INPUT})")
+    parser.add_argument("-f", "--format", choices=("json", "ndjson"), default="json",
+                        help="compact JSON array or newline-delimited JSON (default: json)")
+    parser.add_argument("-o", "--output", help="output file (default: converted_matches.json/.ndjson in DEMOBACKEND)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    output = args.output or OUTPUTS[args.format]
+    n = write_records(convert_csv(args.inputs), output, args.format)
+    print(f"Wrote {n} records to {output}")
@@ -0,0 +1,171 @@
+import asyncio
+import contextlib
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import db
+import enums
+import search_index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE = 30.0  # seconds of quiet after the last submission before a run
+
+_executor: Optional[ProcessPoolExecutor] = None
+_task: Optional[asyncio.Task] = None
+_trigger: Optional[asyncio.Event] = None
+_lock: Optional[asyncio.Lock] = None
+_manual: Optional[asyncio.Task] = None
+_debounce: float = DEFAULT_DEBOUNCE
+_status: Dict[str, Any] = {}
+
+
+def _run_pipeline(rows: list[Dict[str, Any]]) -> tuple[str, Dict[str, Any], Dict[str, float]]:
+    """
+    Worker-process entry point: run calculator_new's pipeline over the submitted rows and
+    return (index JSON, validation summary, per-stage timings).
+    """
+    import calculator_new  # sklearn and the model steps stay out of the API process
+
+    index, validation, timings = calculator_new.run_pipeline(rows)
+    return calculator_new.dump_json(index).decode(), validation, timings
+
+
+def _new_executor() -> ProcessPoolExecutor:
+    # spawn: never fork the API process with its event loop and pool sockets
+    return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _reset_status():
+    _status.clear()
+    _status.update({
+        "state": "idle",        # idle | pending | running
+        "pending": False,       # a submission arrived since the current/last run started
+        "runs": 0,
+        "failures": 0,
+        "last_started": None,
+        "last_finished": None,
+        "last_duration": None,  # seconds, fetch + pipeline + publish
+        "last_error": None,
+        "last_rows": None,
+        "validation": None,     # violation counts over the last run's rows (Scouting_Validation)
+        "timings": {},          # per-stage seconds of the last successful run, plus fetch/publish
+    })
+
+
+async def _run_once():
+    """Fetch submitted rows, run the pipeline in the worker process and publish the index."""
+    async with _lock:
+        await _run_locked()
+
+
+async def _run_locked():
+    global _executor
+    _status.update(state="running", pending=False, last_started=datetime.now(timezone.utc).isoformat())
+    start = time.perf_counter()
+    try:
+        rows = await db.get_match_scouting(statuses=[enums.StatusType.SUBMITTED], include_masks=True)
+        fetched = time.perf_counter()
+
+        loop = asyncio.get_running_loop()
+        data, validation, timings = await loop.run_in_executor(_executor, _run_pipeline, rows)
+        computed = time.perf_counter()
+
+        await db.set_analytics_index(data)
+        search_index.invalidate()
+        timings = {"fetch": round(fetched - start, 4), **timings,
+                   "publish": round(time.perf_counter() - computed, 4)}
+        _status.update(runs=_status["runs"] + 1, last_error=None, last_rows=len(rows),
+                       validation=validation, timings=timings)
+    except BrokenProcessPool as e:
+        # The worker died (e.g. OOM-killed); replace the pool so the next run can proceed
+        logger.error("Analytics worker process died: %s", e)
+        _status.update(failures=_status["failures"] + 1, last_error=f"{type(e).__name__}: {e}")
+        _executor.shutdown(wait=False)
+        _executor = _new_executor()
+    except Exception as e:
+        logger.exception("Analytics run failed")
+        _status.update(failures=_status["failures"] + 1, last_error=f"{type(e).__name__}: {e}")
+    finally:
+        _status.update(
+            state="pending" if _status["pending"] else "idle",
+            last_finished=datetime.now(timezone.utc).isoformat(),
+            last_duration=round(time.perf_counter() - start, 4),
+        )
+
+
+async def _worker():
+    """Wait for a trigger, then for `_debounce` seconds without another one, then run."""
+    while True:
+        await _trigger.wait()
+        while True:
+            _trigger.clear()
+            try:
+                await asyncio.wait_for(_trigger.wait(), timeout=_debounce)
+            except asyncio.TimeoutError:
+                break
+        await _run_once()
+
+
+def start_worker(debounce: float = DEFAULT_DEBOUNCE):
+    """Start the single-process pool and the debounce loop (call once from the app lifespan)."""
+    global _executor, _task, _trigger, _lock, _debounce
+    _reset_status()
+    _debounce = debounce
+    _executor = _new_executor()
+    _trigger = asyncio.Event()
+    _lock = asyncio.Lock()
+    _task = asyncio.create_task(_worker())
+
+
+def notify_submission():
+    """Schedule a run after the debounce window; further calls within it push the run back."""
+    if _trigger is None:
+        return
+    _status["pending"] = True
+    if _status["state"] == "idle":
+        _status["state"] = "pending"
+    _trigger.set()
+
+
+def run_now() -> Dict[str, Any]:
+    """
+    Start a run immediately, skipping the debounce, and return the status without waiting
+    for it (a run already in progress finishes first; repeated calls share one queued run).
+    """
+    global _manual
+    if _task is None:
+        raise RuntimeError("analytics worker is not running")
+    if _manual is None or _manual.done():
+        _status["pending"] = True
+        if _status["state"] == "idle":
+            _status["state"] = "pending"
+        _manual = asyncio.create_task(_run_once())
+    return get_status()
+
+
+def get_status() -> Dict[str, Any]:
+    """Snapshot of the worker's state, counters and the last run's timings."""
+    return {**_status, "debounce": _debounce, "running": _task is not None and not _task.done()}
+
+
+async def stop_worker():
+    """Cancel the debounce loop and shut the process pool down (pending runs are dropped)."""
+    global _executor, _task, _trigger, _lock, _manual
+    for task in (_task, _manual):
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _task = None
+    _manual = None
+    _trigger = None
+    _lock = None
@@ -8,11 +8,13 @@ from collections import defaultdict
 import numpy as np
 from pympler import asizeof
 from pprint import pprint
-from typing import Literal, Callable, Union
+from typing import Literal, Callable, Iterable, Iterator, Union
 import pandas as pd
-from calculators.KMeans_Clustering import compute_ai_ratings
+from calculators.KMeans_Clustering import compute_ai_ratings, field_extractor
 from calculators.Bayesian_Elo_Calculator import compute_feature_elos
 from calculators.Random_Forest_Regressor import predict_all_playable_matches
+from calculators.Theil_Sen_Estimator import theil_sen_batch
+from calculators.Branch_Bitmask import level_counts
 import warnings
 import asyncpg
 from fastapi import HTTPException
@@ -37,7 +39,11 @@ async def get_match_scouting() -> list[dict]:
 
     conn = await get_db_connection(DB_NAME)
     try:
-        rows = await conn.fetch("SELECT * FROM match_scouting WHERE 1=1")
+        rows = await conn.fetch("""
+            SELECT match, match_type, team, alliance, scouter, status, data, last_modified
+            FROM match_scouting
+            WHERE event_key = (SELECT current_event FROM metadata LIMIT 1)
+        """)
 
         return [
             {
@@ -80,24 +86,27 @@ async def write_processed_string(data: str):
         await conn.close()
 
 
-def get_match_scouting_from_json(path: str = "converted_matches.json") -> list[dict]:
-    """Gets match scouting data from a JSON file instead of the database."""
+def get_match_scouting_from_json(path: str = "converted_matches.json") -> Iterator[dict]:
+    """
+    Lazily yields match scouting records from a file instead of the database.
+    Reads both converter outputs: newline-delimited JSON one line at a time, or a JSON array.
+    """
     with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    return [
-        {
-            "match": entry["match"],
-            "match_type": entry["match_type"],
-            "team": entry["team"],
-            "alliance": entry["alliance"],
-            "scouter": entry["scouter"],
-            "status": entry["status"],
-            "data": entry["data"],
-            "last_modified": entry.get("last_modified", "")
-        }
-        for entry in data
-    ]
+        head = f.read(64).lstrip()
+        f.seek(0)
+        entries = json.load(f) if head.startswith("[") else (json.loads(line) for line in f if line.strip())
+
+        for entry in entries:
+            yield {
+                "match": entry["match"],
+                "match_type": entry["match_type"],
+                "team": entry["team"],
+                "alliance": entry["alliance"],
+                "scouter": entry["scouter"],
+                "status": entry["status"],
+                "data": entry["data"],
+                "last_modified": entry.get("last_modified", "")
+            }
 
 
 # --- Utility Functions ---
@@ -172,7 +181,7 @@ def compute_elos(
 
 
 # pylint: disable=too-many-locals, too-many-branches
-def compute_all_stats(raw_data: list[dict]) -> dict:
+def compute_all_stats(raw_data: Iterable[dict]) -> dict:
     """Main function."""
     submitted_matches = [match for match in raw_data if match["status"] == "submitted"]
 
@@ -230,18 +239,9 @@ def compute_all_stats(raw_data: list[dict]) -> dict:
         teleop = match["data"]["teleop"]
         auto = match["data"]["auto"]
 
-        # ===== Step 1.1: Parse branch placement =====
-        teleop_branches = {k: 0 for k in ["l2", "l3", "l4"]}
-        for branch in teleop["branchPlacement"].values():
-            for level in teleop_branches:
-                if branch[level]:
-                    teleop_branches[level] += 1
-
-        auto_branches = {k: 0 for k in ["l2", "l3", "l4"]}
-        for branch in auto["branchPlacement"].values():
-            for level in auto_branches:
-                if branch[level]:
-                    auto_branches[level] += 1
+        # ===== Step 1.1: Parse branch placement (dict or packed int) =====
+        teleop_branches = level_counts(teleop["branchPlacement"])
+        auto_branches = level_counts(auto["branchPlacement"])
 
         # ===== Step 1.2: Calculate accuracy metrics in teleop =====
         match_result["teleop_scoring_location"] = {}
@@ -346,6 +346,23 @@ def compute_all_stats(raw_data: list[dict]) -> dict:
 
     print("Finished heuristics based calculations")
 
+    # ======= Step 1.5: Calculate per team score trend =======
+    match_order = {"qm": 0, "sf": 1, "f": 2}
+    score_series = {}
+    for team, tdata in per_team_data.items():
+        played = sorted(tdata["match"], key=lambda m: (match_order.get(m[0], 99), m[1]))
+        score_series[team] = [
+            per_match_data[mtype][mnum][alliance][team]["score_breakdown"]["total"]
+            for mtype, mnum in played
+            for alliance in ["red", "blue"]
+            if team in per_match_data[mtype][mnum].get(alliance, {})
+        ]
+
+    for team, (slope, intercept) in theil_sen_batch(score_series).items():
+        per_team_data[team]["trend"] = {"slope": round(slope, 3), "intercept": round(intercept, 3)}
+
+    print("Finished score trend calculations")
+
     # ======= Step 2: Calculate elo ranking =======
     def defense_metric(red: dict, blue: dict) -> dict[str, float]:
         avg_opponent = sum(t["score_breakdown"]["total"] for t in blue.values()) / len(blue)
@@ -382,35 +399,39 @@ def compute_all_stats(raw_data: list[dict]) -> dict:
     print("Finished feature based elo calculations")
 
     # ======= Step 4: Calculate kmean ranking =======
+    @field_extractor("l1", "l2", "l3", "l4", "processor", "barge", "driver_skill", "robot_speed")
     def teleop_base_fields(_, __, ___, data):
         sa = data["score_actions"]
         teleop = sa["teleop"]
-        return {
-            "l1": teleop.get("l1", 0),
-            "l2": teleop.get("l2", 0),
-            "l3": teleop.get("l3", 0),
-            "l4": teleop.get("l4", 0),
-            "processor": teleop.get("processor", 0),
-            "barge": teleop.get("barge", 0),
-            "driver_skill": data.get("teleop_scoring_location", {}).get("l3", {}).get("accuracy", 0),
-            "robot_speed": data.get("teleop_scoring_location", {}).get("barge", {}).get("accuracy", 0),
-        }
+        return (
+            teleop.get("l1", 0),
+            teleop.get("l2", 0),
+            teleop.get("l3", 0),
+            teleop.get("l4", 0),
+            teleop.get("processor", 0),
+            teleop.get("barge", 0),
+            data.get("teleop_scoring_location", {}).get("l3", {}).get("accuracy", 0),
+            data.get("teleop_scoring_location", {}).get("barge", {}).get("accuracy", 0),
+        )
 
+    @field_extractor("auton_coral_l1", "auton_coral_l2", "auton_coral_l3", "auton_coral_l4",
+                     "auton_processor", "auton_barge")
     def extract_auto_fields(_, __, ___, data):
         auto = data.get("score_actions", {}).get("auto", {})
-        return {
-            "auton_coral_l1": auto.get("l1", 0),
-            "auton_coral_l2": auto.get("l2", 0),
-            "auton_coral_l3": auto.get("l3", 0),
-            "auton_coral_l4": auto.get("l4", 0),
-            "auton_processor": auto.get("processor", 0),
-            "auton_barge": auto.get("barge", 0)
-        }
+        return (
+            auto.get("l1", 0),
+            auto.get("l2", 0),
+            auto.get("l3", 0),
+            auto.get("l4", 0),
+            auto.get("processor", 0),
+            auto.get("barge", 0)
+        )
 
+    @field_extractor("climb")
     def extract_endgame_fields(_, __, ___, data):
         raw_climb = data.get("score_actions", {}).get("climb", 0)
         climb_val = raw_climb if isinstance(raw_climb, int) else sum(raw_climb.values())
-        return {"climb": climb_val}
+        return (climb_val,)
 
     field_extractors = [teleop_base_fields, extract_auto_fields, extract_endgame_fields]
 
@@ -643,7 +664,7 @@ if __name__ == "__main__":
 '''
 
 format:
-{team_data: {team_number: {ai_stats, elo, match}, _cluster_summary}, match_data: {match_type: {match_number: {alliance: {team_number: {score_actions, score_breakdown, teleop_scoring_location}}}}}}
+{team_data: {team_number: {ai_stats, elo, match, trend}, _cluster_summary}, match_data: {match_type: {match_number: {alliance: {team_number: {score_actions, score_breakdown, teleop_scoring_location}}}}}}
 
     import matplotlib.pyplot as plt
 
@@ -0,0 +1,70 @@
+"""
+Compact encoding for 2025 reef branchPlacement.
+
+The frontend sends branchPlacement as {"A": {"l2": bool, "l3": bool, "l4": bool}, ..., "L": {...}}.
+Packed, it is one 36-bit int: bit (12 * level + branch), level l2/l3/l4 = 0/1/2 and branch A..L = 0..11.
+Each level therefore occupies its own 12-bit lane, so per-level counts are popcounts.
+
+Readers accept either form, so stored rows can mix dicts and packed ints.
+"""
+from typing import Any, Union
+
+import numpy as np
+
+BRANCHES = "ABCDEFGHIJKL"
+LEVELS = ("l2", "l3", "l4")
+LANE_BITS = len(BRANCHES)
+LANE_MASK = (1 << LANE_BITS) - 1
+MASK_BITS = len(LEVELS) * LANE_BITS  # valid packed masks are 0 <= mask < 1 << MASK_BITS
+
+BranchPlacement = Union[dict[str, dict[str, bool]], int]
+
+
+def encode_branches(placement: BranchPlacement) -> int:
+    """Pack a branchPlacement dict into a 36-bit int (ints pass through). Unknown keys are ignored."""
+    if isinstance(placement, int):
+        return placement
+    mask = 0
+    for b, branch in enumerate(BRANCHES):
+        levels = placement.get(branch)
+        if not isinstance(levels, dict):
+            continue
+        for l, level in enumerate(LEVELS):
+            if levels.get(level):
+                mask |= 1 << (l * LANE_BITS + b)
+    return mask
+
+
+def decode_branches(placement: BranchPlacement) -> dict[str, dict[str, bool]]:
+    """Expand a packed int back into the frontend's dict form (dicts pass through)."""
+    if not isinstance(placement, int):
+        return placement
+    return {
+        branch: {level: bool(placement >> (l * LANE_BITS + b) & 1) for l, level in enumerate(LEVELS)}
+        for b, branch in enumerate(BRANCHES)
+    }
+
+
+def level_counts(placement: BranchPlacement) -> dict[str, int]:
+    """Number of filled branches per level, e.g. {"l2": 3, "l3": 0, "l4": 5}."""
+    mask = encode_branches(placement or {})
+    return {level: (mask >> (l * LANE_BITS) & LANE_MASK).bit_count() for l, level in enumerate(LEVELS)}
+
+
+def pack_phases(data: dict[str, Any], phases: tuple[str, ...] = ("auto", "teleop")) -> dict[str, Any]:
+    """Replace branchPlacement with its packed int in each phase of a scouting payload (in place)."""
+    for phase in phases:
+        section = data.get(phase)
+        if isinstance(section, dict) and "branchPlacement" in section:
+            section["branchPlacement"] = encode_branches(section["branchPlacement"])
+    return data
+
+
+def unpack_bits(masks: np.ndarray) -> np.ndarray:
+    """
+    Vectorized decode: (n,) packed ints -> (n, 3, 12) bool array indexed [row, level, branch].
+    Sum over axis 2 for per-level counts, over axis 1 for per-branch counts.
+    """
+    masks = np.asarray(masks, dtype=np.int64)
+    bits = (masks[:, None] >> np.arange(MASK_BITS)) & 1
+    return bits.reshape(len(masks), len(LEVELS), LANE_BITS).astype(bool)
@@ -1,53 +1,121 @@
 from typing import Callable, Any
 
+import numpy as np
 import pandas as pd
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 
 
+def field_extractor(*columns: str):
+    """
+    Declare the output columns of a field extractor.
+    The decorated function returns a tuple of values in the same order as `columns`,
+    which compute_ai_ratings writes straight into preallocated NumPy columns.
+    """
+    def wrap(fn):
+        fn.columns = columns
+        return fn
+    return wrap
+
+
+def _as_float(value: Any) -> float:
+    """Missing or non-numeric extractor output becomes NaN, as it would in a DataFrame column."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _extract_columns(extractor: Callable, keys: list[tuple], records: list[dict]) -> dict[str, Any]:
+    """Run one field extractor over every flattened record and return its output columns."""
+    columns = getattr(extractor, "columns", None)
+    if columns is None:
+        # Undeclared extractor: fall back to one dict per record
+        return pd.DataFrame([extractor(*key, data) for key, data in zip(keys, records)]).to_dict(orient="series")
+
+    values = np.empty((len(records), len(columns)), dtype=float)
+    for i, (key, data) in enumerate(zip(keys, records)):
+        row = extractor(*key, data)
+        try:
+            values[i] = row
+        except (TypeError, ValueError):
+            values[i] = [_as_float(v) for v in row]
+    return dict(zip(columns, values.T))
+
+
 def compute_ai_ratings(
         per_match_data: dict,
-        field_extractors: list[Callable[[str, str, str, dict], dict]],
+        field_extractors: list[Callable[[str, str, str, dict], dict | tuple]],
         derived_feature_functions: list[Callable[[pd.DataFrame], pd.DataFrame]],
         category_calculators: list[dict[str, Any]],  # [{"name": "auto", "fn": lambda df: ...}, ...]
         n_clusters: int = 5,
 ):
-    # 1. Extract basic features
-    rows = []
+    # 1. Flatten matches into a record table, then extract features column by column
+    keys: list[tuple[str, Any, str]] = []
+    teams: list[Any] = []
+    records: list[dict] = []
     for match_type, matches in per_match_data.items():
         for match_num, match in matches.items():
             if not isinstance(match, dict): continue
             for color in ['red', 'blue']:
                 if color not in match: continue
                 for team, data in match[color].items():
-                    row = {
-                        "match_type": match_type,
-                        "match_num": int(match_num),
-                        "team_num": int(team),
-                        "alliance_color": f"{color}Alliance"
-                    }
-                    for extractor in field_extractors:
-                        row |= extractor(match_type, match_num, color, data)
-                    rows.append(row)
-
-    df = pd.DataFrame(rows)
-
-    # 2. Apply derived features
+                    keys.append((match_type, match_num, color))
+                    teams.append(team)
+                    records.append(data)
+
+    match_types, match_nums, colors = zip(*keys) if keys else ((), (), ())
+    columns = {
+        "match_type": np.array(match_types, dtype=object),
+        "match_num": np.array(match_nums, dtype=int),
+        "team_num": np.array(teams, dtype=int),
+        "alliance_color": np.char.add(np.array(colors, dtype=str), "Alliance").astype(object),
+    }
+    for extractor in field_extractors:
+        columns |= _extract_columns(extractor, keys, records)
+
+    df = pd.DataFrame(columns)
+
+    # 2-3. Apply derived features and category calculators
+    df, category_names = _apply_features(df, derived_feature_functions, category_calculators)
+
+    # 4. Aggregate per team
+    agg = {col: "mean" for col in df.columns if col not in ["match_type", "match_num", "team_num", "alliance_color"]}
+    stats = df.groupby("team_num").agg(agg).fillna(0)
+
+    return cluster_team_stats(stats, category_names, n_clusters)
+
+
+def compute_ai_ratings_from_team_means(
+        team_means: pd.DataFrame,
+        derived_feature_functions: list[Callable[[pd.DataFrame], pd.DataFrame]],
+        category_calculators: list[dict[str, Any]],
+        n_clusters: int = 5,
+):
+    """
+    Same as compute_ai_ratings, but starting from per-team feature means (indexed by team_num),
+    e.g. aggregated in SQL. Derived features and categories are applied to the means, which
+    matches compute_ai_ratings as long as they are linear in the features.
+    """
+    stats, category_names = _apply_features(team_means.copy(), derived_feature_functions, category_calculators)
+    return cluster_team_stats(stats.fillna(0), category_names, n_clusters)
+
+
+def _apply_features(df: pd.DataFrame, derived_feature_functions, category_calculators) -> tuple[pd.DataFrame, list[str]]:
     for fn in derived_feature_functions:
         df = fn(df)
 
-    # 3. Apply category calculators
     category_names = []
     for calc in category_calculators:
         name = calc["name"]
         fn = calc["fn"]
         df[name] = fn(df)
         category_names.append(name)
+    return df, category_names
 
-    # 4. Aggregate per team
-    agg = {col: "mean" for col in df.columns if col not in ["match_type", "match_num", "team_num", "alliance_color"]}
-    stats = df.groupby("team_num").agg(agg).fillna(0)
 
+def cluster_team_stats(stats: pd.DataFrame, category_names: list[str], n_clusters: int = 5):
+    """K-Means over per-team category scores, with within-cluster ranking and summaries."""
     # 5. Clustering on category fields
     X = stats[category_names].copy()
     scaler = StandardScaler()
@@ -57,15 +125,11 @@ def compute_ai_ratings(
     stats["cluster"] = kmeans.fit_predict(X_scaled)
 
     # --- Ranked K-Means: rank teams within each cluster ---
-    centroids = kmeans.cluster_centers_
-    scores = []
-    for i, (team, row) in enumerate(stats.iterrows()):
-        c = int(row["cluster"])
-        w = abs(centroids[c]) / (abs(centroids[c]).sum() + 1e-9)  # avoid div by 0
-        s = float((X_scaled[i] * w).sum())
-        scores.append(s)
-
-    stats["intra_rank_score"] = scores
+    # Each team is scored against the |centroid| weights of its own cluster
+    labels = stats["cluster"].to_numpy()
+    abs_centroids = np.abs(kmeans.cluster_centers_)
+    weights = abs_centroids / (abs_centroids.sum(axis=1, keepdims=True) + 1e-9)  # avoid div by 0
+    stats["intra_rank_score"] = np.einsum("ij,ij->i", X_scaled, weights[labels])
     stats["cluster_rank"] = (
         stats.groupby("cluster")["intra_rank_score"]
         .rank(ascending=False, method="dense")
@@ -75,13 +139,12 @@ def compute_ai_ratings(
     # 6. Format output
 
     # (a) Per-team detailed output
-    per_team_output = {
-        team: {
-            **{cat: round(row[cat].item(), 3) for cat in category_names},
-            "cluster": int(row["cluster"])
-        }
-        for team, row in stats.iterrows()
-    }
+    per_team_output = (
+        stats[category_names]
+        .round(3)
+        .assign(cluster=stats["cluster"].astype(int))
+        .to_dict(orient="index")
+    )
 
     # (b) Per-cluster averages
     cluster_summary = (
@@ -0,0 +1,156 @@
+"""
+Scouting coverage: which scheduled (match, team) slots have submitted data.
+
+Rows and the schedule are turned into frames keyed by integers (match type code, match
+number, team number) and compared with groupbys and merges instead of per-match sets and
+"qm 12"-style string keys. Used by calculator_new (filtering incomplete matches, the
+coverage stage) and by the admin coverage endpoint.
+"""
+from typing import Any, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+MATCH_TYPES = ("qm", "sf", "f")
+ALLIANCES = ("red", "blue")
+SLOTS = [f"{a}{i}" for a in ALLIANCES for i in (1, 2, 3)]
+KEY = ["type_code", "match"]
+
+
+def match_types(*columns: pd.Series) -> tuple[str, ...]:
+    """MATCH_TYPES followed by any other types present in `columns` (sorted), so each string gets its own code."""
+    seen = set().union(*(set(c.dropna().astype(str)) for c in columns))
+    return MATCH_TYPES + tuple(sorted(seen - set(MATCH_TYPES)))
+
+
+def _encode_types(match_types: pd.Series, types: tuple[str, ...]) -> pd.Series:
+    """Index into `types`; -1 only for a missing match_type."""
+    return match_types.map({t: i for i, t in enumerate(types)}).fillna(-1).astype(np.int16)
+
+
+def scouting_frame(rows: Iterable[dict[str, Any]], types: Optional[tuple[str, ...]] = None) -> pd.DataFrame:
+    """
+    match_scouting rows as type_code/match/team/alliance/scouter/status columns (data is dropped).
+    type_code indexes `types` (default: match_types() of these rows).
+    """
+    df = pd.DataFrame.from_records(
+        [(r["match_type"], r["match"], r["team"], r["alliance"], r.get("scouter"), r.get("status", "submitted"))
+         for r in rows],
+        columns=["match_type", "match", "team", "alliance", "scouter", "status"],
+    )
+    df["type_code"] = _encode_types(df["match_type"], types or match_types(df["match_type"]))
+    df["match"] = df["match"].astype(np.int64)
+    df["team"] = pd.to_numeric(df["team"], errors="coerce").astype("Int64")
+    return df
+
+
+def schedule_frame(matches: Iterable[dict[str, Any]], types: Optional[tuple[str, ...]] = None) -> pd.DataFrame:
+    """The schedule (red1..blue3 columns per match) melted to one row per team slot; type_code as in scouting_frame."""
+    wide = pd.DataFrame.from_records(
+        [(m["match_type"], m["match_number"], *(m[s] for s in SLOTS)) for m in matches],
+        columns=["match_type", "match", *SLOTS],
+    )
+    long = wide.melt(id_vars=["match_type", "match"], value_vars=SLOTS, var_name="slot", value_name="team")
+    long["alliance"] = long["slot"].str[:-1]
+    long["type_code"] = _encode_types(long["match_type"], types or match_types(long["match_type"]))
+    long["match"] = long["match"].astype(np.int64)
+    long["team"] = pd.to_numeric(long["team"], errors="coerce").astype("Int64")
+    return long.dropna(subset=["team"])
+
+
+def complete_match_mask(rows: list[dict[str, Any]]) -> np.ndarray:
+    """Per row: whether its match has 3 distinct red and 3 distinct blue teams among `rows`."""
+    df = scouting_frame(rows)
+    if df.empty:
+        return np.zeros(0, dtype=bool)
+    per_alliance = df.groupby(KEY + ["alliance"])["team"].nunique().unstack("alliance")
+    per_alliance = per_alliance.reindex(columns=list(ALLIANCES), fill_value=0).fillna(0)
+    complete = per_alliance[(per_alliance["red"] == 3) & (per_alliance["blue"] == 3)].index
+    return pd.MultiIndex.from_frame(df[KEY]).isin(complete)
+
+
+def _match_type(types: tuple[str, ...], type_code: int) -> Optional[str]:
+    return types[type_code] if type_code >= 0 else None
+
+
+def _match_label(types: tuple[str, ...], type_code: int, match: int) -> str:
+    return f"{_match_type(types, type_code) or '?'} {match}"
+
+
+def coverage_report(
+    rows: Iterable[dict[str, Any]],
+    matches: Optional[Iterable[dict[str, Any]]] = None,
+) -> dict[str, Any]:
+    """
+    Structured coverage of match_scouting rows (any status) against the schedule:
+      - summary: slot and match counts, fraction of scheduled slots submitted
+      - missing: per scheduled match with unsubmitted teams, those teams by alliance
+      - incomplete: matches with submissions that lack a full 3 + 3 (what the pipeline drops)
+      - scouters: per scouter, rows claimed / submitted and completion ratio
+    Without a schedule, missing is empty and the slot counts cover scouted matches only.
+    """
+    df = scouting_frame(rows)
+    sched = schedule_frame(matches) if matches is not None else None
+    # One code per match_type string across both frames (unknown types like "qf" keep their own)
+    types = match_types(df["match_type"], *([sched["match_type"]] if sched is not None else []))
+    df["type_code"] = _encode_types(df["match_type"], types)
+    submitted = df[df["status"] == "submitted"]
+    sub_slots = submitted[KEY + ["team"]].drop_duplicates()
+
+    # --- Scheduled slots without a submission (anti-join on integer keys) ---
+    missing: list[dict[str, Any]] = []
+    scheduled_matches = 0
+    if sched is not None:
+        sched["type_code"] = _encode_types(sched["match_type"], types)
+        scheduled_matches = len(sched[KEY].drop_duplicates())
+        joined = sched.merge(sub_slots.assign(done=True), on=KEY + ["team"], how="left")
+        gaps = joined[joined["done"].isna()].sort_values(KEY + ["slot"])
+        for (code, match), g in gaps.groupby(KEY, sort=False):
+            missing.append({
+                "match_type": _match_type(types, code),
+                "match": int(match),
+                "key": _match_label(types, code, match),
+                **{a: [int(t) for t in g.loc[g["alliance"] == a, "team"]] for a in ALLIANCES},
+            })
+        slots = len(sched)
+        covered = int(joined["done"].notna().sum())
+    else:
+        slots = covered = len(sub_slots)
+
+    # --- Matches the pipeline would drop (not 3 red + 3 blue submitted) ---
+    incomplete: list[dict[str, Any]] = []
+    if not submitted.empty:
+        counts = submitted.groupby(KEY + ["alliance"])["team"].nunique().unstack("alliance")
+        counts = counts.reindex(columns=list(ALLIANCES), fill_value=0).fillna(0).astype(int)
+        short = counts[(counts["red"] < 3) | (counts["blue"] < 3)]
+        incomplete = [
+            {"match_type": _match_type(types, code), "match": int(match), "key": _match_label(types, code, match),
+             "red": int(r.red), "blue": int(r.blue)}
+            for (code, match), r in zip(short.index, short.itertuples(index=False))
+        ]
+    complete = (submitted[KEY].drop_duplicates().shape[0]) - len(incomplete)
+
+    # --- Per-scouter completion ---
+    claimed = df[df["scouter"].notna()]
+    per_scouter = claimed.groupby("scouter")["status"].agg(
+        claimed="size", submitted=lambda s: int((s == "submitted").sum())
+    )
+    scouters = [
+        {"scouter": name, "claimed": int(r.claimed), "submitted": int(r.submitted),
+         "completion": round(r.submitted / r.claimed, 3)}
+        for name, r in zip(per_scouter.index, per_scouter.itertuples(index=False))
+    ]
+
+    return {
+        "summary": {
+            "scheduled_matches": scheduled_matches,
+            "complete_matches": complete,
+            "slots": slots,
+            "submitted_slots": covered,
+            "coverage": round(covered / slots, 3) if slots else None,
+            "unclaimed_rows": int(df["scouter"].isna().sum()),
+        },
+        "missing": missing,
+        "incomplete": incomplete,
+        "scouters": scouters,
+    }
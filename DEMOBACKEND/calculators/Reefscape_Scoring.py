@@ -0,0 +1,25 @@
+"""
+2025 Reefscape heuristic point values, shared by the Python scorer (calculator_new.predict_team_scores)
+and the SQL that scores rows server-side (summary triggers, per-team aggregation).
+"""
+
+# weights reflect official 2025 Reefscape values
+AUTO_WEIGHTS = {"l1": 3, "l2": 4, "l3": 6, "l4": 7, "barge": 4, "processor": 2}
+TELEOP_WEIGHTS = {"l1": 2, "l2": 3, "l3": 4, "l4": 5, "barge": 4, "processor": 2}
+AUTO_MOVED_POINTS = 3
+CLIMB_SPEED_POINTS = 12
+
+
+def points_sql(row: str = "") -> dict[str, str]:
+    """
+    SQL expressions for one match_scouting row's auto/teleop/climb points, over its generated
+    columns (db._MS_GENERATED_COLUMNS). `row` prefixes column references, e.g. "NEW.".
+    Missing fields score 0, like predict_team_scores.
+    """
+    auto = " + ".join(f"COALESCE({row}auto_{k}, 0) * {w}" for k, w in AUTO_WEIGHTS.items())
+    teleop = " + ".join(f"COALESCE({row}teleop_{k}, 0) * {w}" for k, w in TELEOP_WEIGHTS.items())
+    return {
+        "auto": f"{auto} + CASE WHEN {row}auto_moved THEN {AUTO_MOVED_POINTS} ELSE 0 END",
+        "teleop": teleop,
+        "climb": f"CASE WHEN {row}climb_success THEN trunc(COALESCE({row}climb_speed, 0) * {CLIMB_SPEED_POINTS}) ELSE 0 END",
+    }
@@ -0,0 +1,123 @@
+"""
+Reef scoring habits from branchPlacement, per team and per phase.
+
+Each phase's branchPlacement column is packed (Branch_Bitmask layout) with column ops:
+rows from the DB carry it already packed in generated columns; otherwise dict placements
+are flattened in one pass into a (row, branch x level) bool array and weighted into
+masks with one matrix product, and valid packed ints pass through. The masks are unpacked into one bool array and summed
+per team into a (team, phase, level, branch) count tensor, from which preferences and
+level ratios are read. The placements of both phases are always counted.
+"""
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+from calculators.Branch_Bitmask import BRANCHES, LANE_BITS, LEVELS, MASK_BITS, unpack_bits
+
+PHASES = ("auto", "teleop")
+# Packed bit value of each flattened (branch, level) column, branch-major like phase_masks' flatten
+_FLAT_WEIGHTS = np.array([1 << (l * LANE_BITS + b) for b in range(len(BRANCHES)) for l in range(len(LEVELS))],
+                         dtype=np.int64)
+
+
+def _placements(rows: list[dict[str, Any]], phase: str) -> list[Any]:
+    """Each row's branchPlacement for one phase (None where the row or phase is malformed)."""
+    placements = []
+    for r in rows:
+        data = r["data"] if isinstance(r["data"], dict) else {}
+        section = data.get(phase)
+        placements.append(section.get("branchPlacement") if isinstance(section, dict) else None)
+    return placements
+
+
+def _levels(value: Any) -> dict:
+    return value if isinstance(value, dict) else {}
+
+
+def phase_masks(placements: list[Any]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (packed masks, reported) for a column of branchPlacement values.
+    Packed ints in 0 <= v < 2**MASK_BITS are taken as-is. Dicts are flattened in one
+    pass into a bool array of (branch, level) columns (truthy = filled) and combined
+    with the bit weights. A dict reports placements if it is non-empty;
+    anything else (None, bool, str, out-of-range int) counts as none reported.
+    """
+    n = len(placements)
+    masks = np.zeros(n, dtype=np.int64)
+    kinds = np.fromiter(
+        (2 if isinstance(p, dict)
+         else 1 if isinstance(p, int) and not isinstance(p, bool) and 0 <= p < 1 << MASK_BITS
+         else 0 for p in placements),
+        np.int8, n,
+    )
+    reported = kinds == 1
+    masks[reported] = np.fromiter((p for p, k in zip(placements, kinds) if k == 1), np.int64, int(reported.sum()))
+
+    dict_rows = np.flatnonzero(kinds == 2)
+    if len(dict_rows):
+        dicts = [placements[i] for i in dict_rows]
+        filled = np.array(
+            [[bool(_levels(p.get(branch)).get(level)) for branch in BRANCHES for level in LEVELS] for p in dicts],
+            dtype=bool,
+        ).reshape(len(dicts), MASK_BITS)
+        masks[dict_rows] = filled.astype(np.int64) @ _FLAT_WEIGHTS
+        reported[dict_rows] = np.fromiter((bool(p) for p in dicts), bool, len(dicts))
+    return masks, reported
+
+
+def _column_masks(rows: list[dict[str, Any]], phase: str) -> tuple[np.ndarray, np.ndarray]:
+    """(masks, reported) from the packed `<phase>_branch_mask` column (NULL = none reported)."""
+    values = pd.array([r[f"{phase}_branch_mask"] for r in rows], dtype="Int64")
+    return values.fillna(0).to_numpy(dtype=np.int64), ~values.isna()
+
+
+def placement_counts(submitted_rows: Iterable[dict[str, Any]]) -> tuple[pd.Index, np.ndarray]:
+    """
+    Count tensor of filled branches: (teams, counts) with counts[t, phase, level, branch]
+    over PHASES x LEVELS x BRANCHES. Teams without any reported placement are left out.
+    Rows fetched with the DB's auto_branch_mask/teleop_branch_mask generated columns are
+    read from those directly; otherwise each phase's branchPlacement is packed here.
+    """
+    rows = list(submitted_rows)
+    packed = bool(rows) and all(f"{phase}_branch_mask" in r for r in rows for phase in PHASES)
+    per_phase = [_column_masks(rows, phase) if packed else phase_masks(_placements(rows, phase)) for phase in PHASES]
+    masks = np.stack([m for m, _ in per_phase], axis=1)
+    reported = per_phase[0][1] | per_phase[1][1]
+    teams = np.asarray([str(r["team"]) for r in rows], dtype=object)
+    codes, team_index = pd.factorize(teams[reported])
+
+    bits = unpack_bits(masks[reported].ravel()).reshape(-1, len(PHASES), len(LEVELS), len(BRANCHES))
+    counts = np.zeros((len(team_index), len(PHASES), len(LEVELS), len(BRANCHES)), dtype=np.int64)
+    np.add.at(counts, codes, bits)
+    return pd.Index(team_index), counts
+
+
+def _summarize(counts: np.ndarray) -> dict[str, Any]:
+    """Position preference and level ratios from one (levels, branches) count matrix."""
+    per_branch = counts.sum(axis=0)
+    per_level = counts.sum(axis=1)
+    order = np.argsort(-per_branch, kind="stable")
+    total = int(per_level.sum()) or 1
+    return {
+        "position_preference": [(BRANCHES[b], int(per_branch[b])) for b in order if per_branch[b]],
+        "accuracy_by_level": {  # actually level usage ratio
+            level: round(int(n) / total, 3) for level, n in zip(LEVELS, per_level) if n
+        },
+    }
+
+
+def compute_habits(submitted_rows: Iterable[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """
+    Per team: position_preference (branches by fill count, most used first) and
+    accuracy_by_level (share of placements per level) over both phases, plus the same
+    two summaries for each phase under "phases".
+    """
+    teams, counts = placement_counts(submitted_rows)
+    return {
+        team: {
+            **_summarize(counts[t].sum(axis=0)),
+            "phases": {phase: _summarize(counts[t, p]) for p, phase in enumerate(PHASES)},
+        }
+        for t, team in enumerate(teams)
+    }
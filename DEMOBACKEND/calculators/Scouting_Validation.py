@@ -0,0 +1,205 @@
+"""
+Rule checks for match scouting data, shared by the 2025hop CSV tools and the backend.
+
+Both sources are first mapped to one frame (frame_from_csv / frame_from_rows /
+frame_from_columns): a row per scouted robot with match_type, match, team, alliance,
+scouter and the COUNT_COLUMNS. Every rule is then a groupby or column comparison over the
+whole frame, and validate() returns the violations as plain dicts:
+
+    {"rule", "severity", "match_type", "match", "alliance", "team", "detail"}
+
+Rules:
+  - alliance_size:   an alliance in a match does not have exactly 3 distinct teams
+                     (with LIVE_RULES, fewer than 3 is a warning: the match may still be scouted)
+  - alliance:        a row whose alliance is missing or not red/blue
+  - duplicate_team:  a team appears on both alliances of a match
+  - duplicate_entry: a team has more than one row for the same match and alliance
+  - level_cap:       an alliance scored more than 12 coral on one of L2-L4 (auto + teleop)
+  - impossible_value: a negative, non-integer or single-robot-over-cap count
+"""
+import functools
+from typing import Any, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from calculators.Branch_Bitmask import level_counts
+
+PHASES = ("auto", "teleop")
+FIELDS = ("l1", "l2", "l3", "l4", "processor", "barge")
+COUNT_COLUMNS = [f"{phase}_{field}" for phase in PHASES for field in FIELDS]
+KEY_COLUMNS = ["match_type", "match", "team", "alliance", "scouter"]
+CAPPED_LEVELS = ("l2", "l3", "l4")
+BRANCHES_PER_LEVEL = 12
+VIOLATION_COLUMNS = ["rule", "severity", "match_type", "match", "alliance", "team", "detail"]
+ALLIANCES = ("red", "blue")
+
+# 2025hop scouting-app export columns (all_matches_quals_only.csv / formatted_matches.csv)
+CSV_COLUMNS = {
+    "Pre Match.match_num": "match",
+    "Pre Match.teamNum": "team",
+    "Pre Match.allianceColor": "alliance",
+    "Auton.autonCoral L1": "auto_l1",
+    "Auton.autonCoral L2": "auto_l2",
+    "Auton.autonCoral L3": "auto_l3",
+    "Auton.autonCoral L4": "auto_l4",
+    "Auton.autonProc": "auto_processor",
+    "Auton.autonNet": "auto_barge",
+    "Match.matchCoral L1": "teleop_l1",
+    "Match.matchCoral L2": "teleop_l2",
+    "Match.matchCoral L3": "teleop_l3",
+    "Match.matchCoral L4": "teleop_l4",
+    "Match.matchProc": "teleop_processor",
+    "Match.matchNet": "teleop_barge",
+}
+CSV_MATCH_TYPES = {"Qualification": "qm"}
+
+
+# ================== Adapters ==================
+def _finish(df: pd.DataFrame) -> pd.DataFrame:
+    """Common dtypes: Int64 match/team, float counts (NaN = not reported)."""
+    for col in KEY_COLUMNS:
+        if col not in df:
+            df[col] = None
+    for col in COUNT_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce") if col in df else np.nan
+    df["match"] = pd.to_numeric(df["match"], errors="coerce").astype("Int64")
+    df["team"] = pd.to_numeric(df["team"], errors="coerce").astype("Int64")
+    return df[KEY_COLUMNS + COUNT_COLUMNS].reset_index(drop=True)
+
+
+def frame_from_csv(df: pd.DataFrame) -> pd.DataFrame:
+    """Map a 2025hop export (raw or format_data.py output) to the validation frame."""
+    out = df.rename(columns=CSV_COLUMNS)
+    if "Pre Match.match_type" in df:
+        types = df["Pre Match.match_type"].astype(str)
+        out["match_type"] = types.map(CSV_MATCH_TYPES).fillna(types.str.lower())
+    else:
+        out["match_type"] = "qm"
+    colors = out["alliance"].astype(str).str.lower()
+    # Missing or unrecognised colors stay None so check_alliance reports the row
+    out["alliance"] = np.select([colors.str.contains("red"), colors.str.contains("blue")], ["red", "blue"], None)
+    out["scouter"] = df.get("scouter.name")
+    return _finish(out)
+
+
+def frame_from_columns(records: Iterable[dict[str, Any]]) -> pd.DataFrame:
+    """Records that already carry COUNT_COLUMNS, e.g. match_scouting's generated columns."""
+    return _finish(pd.DataFrame.from_records(list(records), columns=KEY_COLUMNS + COUNT_COLUMNS))
+
+
+def frame_from_rows(rows: Iterable[dict[str, Any]]) -> pd.DataFrame:
+    """match_scouting rows with a JSON `data` column (the analytics pipeline's input)."""
+    records = []
+    for r in rows:
+        data = r.get("data") if isinstance(r.get("data"), dict) else {}
+        rec = {k: r.get(k) for k in KEY_COLUMNS}
+        for phase in PHASES:
+            section = data.get(phase) if isinstance(data.get(phase), dict) else {}
+            placement = section.get("branchPlacement")
+            if isinstance(placement, (dict, int)) and not isinstance(placement, bool):
+                rec |= {f"{phase}_{lvl}": n for lvl, n in level_counts(placement).items()}
+            for field in ("l1", "processor", "barge"):
+                rec[f"{phase}_{field}"] = section.get(field)
+        records.append(rec)
+    return frame_from_columns(records)
+
+
+# ================== Rules ==================
+def _violations(rule: str, severity: str, df: pd.DataFrame, detail: pd.Series) -> pd.DataFrame:
+    return pd.DataFrame({
+        "rule": rule,
+        "severity": severity,
+        "match_type": df["match_type"].to_numpy(),
+        "match": df["match"].to_numpy(),
+        "alliance": df["alliance"].to_numpy(),
+        "team": df["team"].to_numpy(),
+        "detail": detail.to_numpy(),
+    })
+
+
+def check_alliance_size(df: pd.DataFrame, live: bool = False) -> pd.DataFrame:
+    """
+    Alliances without exactly 3 teams. While an event is live (`live`), fewer than 3 is only
+    a warning since unscouted robots are expected; more than 3 is always an error.
+    """
+    sizes = df.groupby(["match_type", "match", "alliance"])["team"].nunique().rename("teams").reset_index()
+    matches = sizes[["match_type", "match"]].drop_duplicates()
+    full = matches.merge(pd.DataFrame({"alliance": list(ALLIANCES)}), how="cross")
+    full = full.merge(sizes, on=["match_type", "match", "alliance"], how="left").fillna({"teams": 0})
+    short, over = full[full["teams"] < 3], full[full["teams"] > 3]
+    return pd.concat([
+        _violations("alliance_size", "warning" if live else "error", short.assign(team=None),
+                    short["teams"].astype(int).map(lambda n: f"{n} teams (expected 3)")),
+        _violations("alliance_size", "error", over.assign(team=None),
+                    over["teams"].astype(int).map(lambda n: f"{n} teams (expected 3)")),
+    ])
+
+
+def check_alliance(df: pd.DataFrame) -> pd.DataFrame:
+    bad = df[~df["alliance"].isin(ALLIANCES)]
+    return _violations("alliance", "error", bad,
+                       bad["alliance"].map(lambda a: "missing or unknown alliance" if pd.isna(a) else f"unknown alliance {a!r}"))
+
+
+def check_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+    both = df.groupby(["match_type", "match", "team"])["alliance"].nunique()
+    both = both[both > 1].reset_index().assign(alliance=None)
+    repeated = df.groupby(["match_type", "match", "alliance", "team"]).size().rename("rows")
+    repeated = repeated[repeated > 1].reset_index()
+    return pd.concat([
+        _violations("duplicate_team", "error", both, pd.Series(["on both alliances"] * len(both), dtype=object)),
+        _violations("duplicate_entry", "warning", repeated, repeated["rows"].map(lambda n: f"{n} rows")),
+    ])
+
+
+def check_level_caps(df: pd.DataFrame) -> pd.DataFrame:
+    cols = [f"{phase}_{lvl}" for lvl in CAPPED_LEVELS for phase in PHASES]
+    totals = df[cols].fillna(0).groupby([df["match_type"], df["match"], df["alliance"]]).sum()
+    per_level = pd.DataFrame({lvl: totals[f"auto_{lvl}"] + totals[f"teleop_{lvl}"] for lvl in CAPPED_LEVELS})
+    per_level.columns.name = "level"
+    over = per_level.stack().rename("coral").reset_index()
+    over = over[over["coral"] > BRANCHES_PER_LEVEL]
+    return _violations("level_cap", "error", over.assign(team=None),
+                       over["level"].str.upper() + ": " + over["coral"].astype(int).astype(str)
+                       + f" coral (max {BRANCHES_PER_LEVEL})")
+
+
+def check_values(df: pd.DataFrame) -> pd.DataFrame:
+    counts = df[COUNT_COLUMNS]
+    capped = [f"{phase}_{lvl}" for phase in PHASES for lvl in CAPPED_LEVELS]
+    bad = (counts < 0) | (counts.notna() & (counts % 1 != 0))
+    bad[capped] |= counts[capped] > BRANCHES_PER_LEVEL
+    rows, cols = np.nonzero(bad.to_numpy())
+    hits = df.iloc[rows]
+    detail = pd.Series([f"{COUNT_COLUMNS[c]} = {v:g}" for c, v in zip(cols, counts.to_numpy()[rows, cols])], dtype=object)
+    return _violations("impossible_value", "error", hits, detail)
+
+
+RULES = (check_alliance_size, check_alliance, check_duplicates, check_level_caps, check_values)
+# For data from an event in progress (the backend): partly scouted matches are not errors
+LIVE_RULES = (functools.partial(check_alliance_size, live=True),) + RULES[1:]
+
+
+def validate(df: pd.DataFrame, rules=RULES) -> list[dict[str, Any]]:
+    """Run every rule over a validation frame; violations ordered by match, then rule."""
+    if df.empty:
+        return []
+    found = pd.concat([rule(df) for rule in rules], ignore_index=True)
+    found = found.sort_values(["match_type", "match", "rule"], kind="stable")
+    found = found.astype(object).where(found.notna(), None)
+    return [
+        {**v, "match": int(v["match"]) if v["match"] is not None else None,
+         "team": int(v["team"]) if v["team"] is not None else None}
+        for v in found[VIOLATION_COLUMNS].to_dict(orient="records")
+    ]
+
+
+def summarize(violations: list[dict[str, Any]], rows: Optional[int] = None) -> dict[str, Any]:
+    """Counts per rule and severity (plus the number of rows checked, if given)."""
+    by_rule: dict[str, int] = {}
+    by_severity: dict[str, int] = {}
+    for v in violations:
+        by_rule[v["rule"]] = by_rule.get(v["rule"], 0) + 1
+        by_severity[v["severity"]] = by_severity.get(v["severity"], 0) + 1
+    return {"rows": rows, "violations": len(violations), "by_rule": by_rule, "by_severity": by_severity}
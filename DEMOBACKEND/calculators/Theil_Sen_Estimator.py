@@ -1,3 +1,8 @@
+from typing import Hashable, Sequence
+
+import numpy as np
+
+
 def theil_sen_estimator(y: list[float], x: list[float] = None) -> tuple[float, float]:
     """
     Computes the Theil-Sen estimator.
@@ -11,26 +16,54 @@ def theil_sen_estimator(y: list[float], x: list[float] = None) -> tuple[float, f
     if len(y) < 2:
         raise ValueError("Need at least 2 points")
 
-    # Compute all pairwise slopes
-    slopes = []
-    for i in range(len(x)):
-        for j in range(i + 1, len(x)):
-            dx = x[j] - x[i]
-            if dx != 0:
-                dy = y[j] - y[i]
-                slopes.append(dy / dx)
-
-    if not slopes:
+    fit = theil_sen_batch({0: y}, {0: x})
+    if 0 not in fit:
         raise ValueError("All x values are identical")
+    return fit[0]
+
+
+def theil_sen_batch(
+        ys: dict[Hashable, Sequence[float]],
+        xs: dict[Hashable, Sequence[float]] = None,
+) -> dict[Hashable, tuple[float, float]]:
+    """
+    Fits a Theil-Sen trend line for every series in one vectorized pass.
+    Series are padded into a single NaN-masked array, so all pairwise slopes
+    are computed together and reduced with np.nanmedian.
+    If a key has no entry in xs, assumes x = [0, 1, 2, ..., len(y) - 1].
+    Returns: {key: (slope, intercept)}, skipping series with fewer than 2 distinct x values.
+    """
+    xs = xs or {}
+    keys = [k for k, y in ys.items() if len(y) >= 2]
+    if not keys:
+        return {}
 
-    slope = median(slopes)
-    intercept = median([y[i] - slope * x[i] for i in range(len(x))])
+    n = max(len(ys[k]) for k in keys)
+    y = np.full((len(keys), n), np.nan)
+    x = np.full((len(keys), n), np.nan)
+    for row, k in enumerate(keys):
+        m = len(ys[k])
+        kx = xs.get(k)
+        if kx is not None and len(kx) != m:
+            raise ValueError(f"x and y must be the same length for {k!r}")
+        y[row, :m] = ys[k]
+        x[row, :m] = np.arange(m) if kx is None else kx
 
-    return slope, intercept
+    # All pairwise slopes (i < j); padded or vertical pairs become NaN
+    i, j = np.triu_indices(n, k=1)
+    dx = x[:, j] - x[:, i]
+    dy = y[:, j] - y[:, i]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slopes = np.where(dx != 0, dy / dx, np.nan)
 
+    valid = ~np.isnan(slopes).all(axis=1)
+    slope = np.full(len(keys), np.nan)
+    slope[valid] = np.nanmedian(slopes[valid], axis=1)
+    intercept = np.full(len(keys), np.nan)
+    intercept[valid] = np.nanmedian(y[valid] - slope[valid, None] * x[valid], axis=1)
 
-def median(data: list[float]) -> float:
-    s = sorted(data)
-    n = len(s)
-    mid = n // 2
-    return 0.5 * (s[mid - 1] + s[mid]) if n % 2 == 0 else s[mid]
+    return {
+        k: (float(slope[row]), float(intercept[row]))
+        for row, k in enumerate(keys)
+        if valid[row]
+    }
@@ -0,0 +1,98 @@
+"""
+Benchmark: stdlib json vs the orjson codecs used by db.py and the API router.
+
+Times, per request-sized batch of match scouting records:
+  - JSONB decode/encode as done by the asyncpg codecs
+  - response rendering (JSONResponse vs ORJSONResponse). FastAPI runs jsonable_encoder
+    on anything that is not already a Response, so handlers returning large payloads
+    hand back an ORJSONResponse themselves.
+
+Run from DEMOBACKEND:  python custom_scripts/bench_json.py [--records 60] [--repeat 200]
+"""
+import argparse
+import json
+import random
+import sys
+import timeit
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db  # noqa: E402
+
+
+def make_record(rng: random.Random, match: int, team: int) -> dict:
+    """One match_scouting row shaped like the scouting app's payload."""
+    def phase() -> dict:
+        return {
+            "branchPlacement": {
+                b: {lvl: rng.random() < 0.3 for lvl in ("l2", "l3", "l4")}
+                for b in "ABCDEFGHIJKL"
+            },
+            "algaePlacement": {"reef": rng.randint(0, 3), "ground": rng.randint(0, 2)},
+            "missed": {"l1": rng.randint(0, 2), "l2": rng.randint(0, 2), "l3": rng.randint(0, 2), "l4": rng.randint(0, 2)},
+            "l1": rng.randint(0, 4),
+            "processor": rng.randint(0, 4),
+            "barge": rng.randint(0, 4),
+            "missAlgae": rng.randint(0, 2),
+            "moved": rng.random() < 0.9,
+        }
+
+    return {
+        "event_key": "2025bench",
+        "match": match,
+        "match_type": "qm",
+        "team": str(team),
+        "alliance": rng.choice(["red", "blue"]),
+        "scouter": f"scouter{rng.randint(1, 20)}",
+        "status": "submitted",
+        "data": {
+            "auto": phase(),
+            "teleop": phase(),
+            "postmatch": {"climbSpeed": rng.random() * 10, "climbSuccess": rng.random() < 0.7, "notes": "x" * 40},
+        },
+        "last_modified": 1_700_000_000 + match,
+    }
+
+
+def bench(label: str, fn, repeat: int) -> float:
+    per_call = min(timeit.repeat(fn, number=repeat, repeat=5)) / repeat
+    print(f"  {label:<34}{per_call * 1e6:>10.1f} µs")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=60, help="records per request (default: one event-match page)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    records = [make_record(rng, m, 1000 + t) for m in range(args.records // 6 + 1) for t in range(6)][:args.records]
+    payloads = [r["data"] for r in records]
+    text = [json.dumps(p) for p in payloads]
+    wire = [db._jsonb_encode(p) for p in payloads]
+    print(f"{len(records)} records, {sum(map(len, wire)) / len(wire):.0f} bytes of JSONB each\n")
+
+    print("JSONB decode (rows -> dicts)")
+    old = bench("json.loads", lambda: [json.loads(t) for t in text], args.repeat)
+    new = bench("orjson binary codec", lambda: [db._jsonb_decode(w) for w in wire], args.repeat)
+    print(f"  speedup {old / new:.1f}x\n")
+
+    print("JSONB encode (dicts -> parameters)")
+    old = bench("json.dumps", lambda: [json.dumps(p) for p in payloads], args.repeat)
+    new = bench("orjson binary codec", lambda: [db._jsonb_encode(p) for p in payloads], args.repeat)
+    print(f"  speedup {old / new:.1f}x\n")
+
+    print("Response rendering (what the router does per request)")
+    body = {"count": len(records), "matches": records}
+    old = bench("JSONResponse", lambda: JSONResponse(jsonable_encoder(body)), args.repeat)
+    new = bench("ORJSONResponse", lambda: ORJSONResponse(jsonable_encoder(body)), args.repeat)
+    direct = bench("ORJSONResponse returned directly", lambda: ORJSONResponse(body), args.repeat)
+    print(f"  speedup {old / new:.1f}x (router default), {old / direct:.1f}x (handler returns the response)")
+
+
+if __name__ == "__main__":
+    main()
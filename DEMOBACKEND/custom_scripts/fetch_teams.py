@@ -1,8 +1,10 @@
 import asyncio
+import json
 import aiohttp
 import asyncpg
 import os
 from datetime import datetime
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,67 +13,140 @@ TBA_AUTH_KEY = os.getenv("TBA_KEY")
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 BASE_URL = "https://www.thebluealliance.com/api/v3"
+MAX_CONCURRENCY = 5  # simultaneous TBA requests
+PAGE_BATCH = 10      # pages requested per wave
+MAX_RETRIES = 4      # extra attempts per page on 429/5xx or connection errors
+RETRY_BASE_DELAY = 1.0  # seconds, doubled after each failed attempt
+FAILED = "failed"    # fetch_teams result: retries exhausted on a transient error
+REJECTED = "rejected"  # fetch_teams result: non-retryable 4xx (e.g. bad TBA_KEY), stops the sync
+STATE_FILE = Path(__file__).with_name("fetch_teams_state.json")  # Last-Modified per page
 
 # -------------------- Fetch Teams --------------------
-async def fetch_teams(session, page: int):
+async def fetch_teams(session, semaphore, page: int, last_modified: str | None):
+    """
+    Fetch one page of teams, retrying 429/5xx responses and connection errors with
+    exponential backoff.
+    Returns (teams, last_modified); teams is None when the page is unchanged
+    since `last_modified` (HTTP 304), [] past the last page, FAILED when retries
+    ran out (the sync skips the page and keeps its old state) and REJECTED on a
+    non-retryable 4xx response.
+    """
     url = f"{BASE_URL}/teams/{page}"
     headers = {"X-TBA-Auth-Key": TBA_AUTH_KEY}
-    async with session.get(url, headers=headers) as resp:
-        if resp.status != 200:
-            print(f"[WARN] Failed to fetch page {page} (status {resp.status})")
-            return []
-        return await resp.json()
-
-# -------------------- Insert Team --------------------
-async def insert_team(conn, team):
-    try:
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with semaphore, session.get(url, headers=headers) as resp:
+                if resp.status == 304:
+                    return None, last_modified
+                if resp.status == 200:
+                    return await resp.json(), resp.headers.get("Last-Modified")
+                error = f"status {resp.status}"
+                if resp.status != 429 and resp.status < 500:
+                    print(f"[ERROR] Page {page} rejected ({error}), not retrying.")
+                    return REJECTED, None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = f"{type(e).__name__}: {e}"
+        if attempt < MAX_RETRIES:
+            delay = RETRY_BASE_DELAY * 2 ** attempt
+            print(f"[RETRY] Page {page} failed ({error}), retrying in {delay:g}s...")
+            await asyncio.sleep(delay)
+    print(f"[WARN] Failed to fetch page {page} ({error}), skipping it.")
+    return FAILED, None
+
+# -------------------- Upsert Teams --------------------
+async def upsert_teams(conn, teams) -> int:
+    """Stage all teams with COPY into a temp table, then upsert them in one statement."""
+    now = datetime.now()
+    records = [
+        (team["team_number"], team["nickname"] or "Unknown", team["rookie_year"] or None, now)
+        for team in teams
+    ]
+    async with conn.transaction():
+        await conn.execute("CREATE TEMP TABLE teams_stage (LIKE teams INCLUDING DEFAULTS) ON COMMIT DROP")
+        await conn.copy_records_to_table(
+            "teams_stage",
+            records=records,
+            columns=["team_number", "nickname", "rookie_year", "last_updated"],
+        )
         await conn.execute(
             """
             INSERT INTO teams (team_number, nickname, rookie_year, last_updated)
-            VALUES ($1, $2, $3, $4)
+            SELECT DISTINCT ON (team_number) team_number, nickname, rookie_year, last_updated
+            FROM teams_stage
             ON CONFLICT (team_number) DO UPDATE
             SET nickname = EXCLUDED.nickname,
                 rookie_year = EXCLUDED.rookie_year,
                 last_updated = EXCLUDED.last_updated
-            """,
-            team["team_number"],
-            team["nickname"] or "Unknown",
-            team["rookie_year"] or None,
-            datetime.now(),
+            """
         )
-    except Exception as e:
-        print(f"[ERR] Team {team.get('team_number')}: {e}")
+    return len(records)
 
 # -------------------- Main --------------------
 async def main():
     print("[INFO] Starting TBA → Neon sync...")
-    conn = await asyncpg.connect(DATABASE_URL)
+    state: dict[str, str] = json.loads(STATE_FILE.read_text()) if STATE_FILE.exists() else {}
+    new_state = dict(state)
+    changed_teams = []
+    unchanged_pages = 0
+    failed_pages = []
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
     async with aiohttp.ClientSession() as session:
         page = 0
-        total = 0
+        done = False
 
-        while True:
-            teams = await fetch_teams(session, page)
-            if not teams:
-                print(f"[INFO] No more teams (page {page}). Exiting.")
+        while not done:
+            pages = range(page, page + PAGE_BATCH)
+            results = await asyncio.gather(
+                *(fetch_teams(session, semaphore, p, state.get(str(p))) for p in pages)
+            )
+
+            if any(teams is REJECTED for teams, _ in results):
+                print("[ERROR] TBA rejected the request (check TBA_KEY). Stopping the sync.")
+                break
+            if all(teams is FAILED for teams, _ in results):
+                print(f"[ERROR] Every page in {pages.start}-{pages.stop - 1} failed. Stopping the sync.")
+                failed_pages.extend(pages)
                 break
 
-            print(f"[PAGE {page}] Retrieved {len(teams)} teams from TBA.")
+            for p, (teams, last_modified) in zip(pages, results):
+                if teams is FAILED:
+                    failed_pages.append(p)
+                    continue
+                if teams is None:
+                    unchanged_pages += 1
+                    print(f"[PAGE {p}] Unchanged since {last_modified}, skipped.")
+                    continue
+                if not teams:
+                    print(f"[INFO] No more teams (page {p}). Exiting.")
+                    done = True
+                    break
+
+                print(f"[PAGE {p}] Retrieved {len(teams)} teams from TBA.")
+                changed_teams.extend(teams)
+                if last_modified:
+                    new_state[str(p)] = last_modified
 
-            # Sequential insert (safe + minimal overhead)
-            for i, team in enumerate(teams, 1):
-                await insert_team(conn, team)
-                total += 1
-                # Light heartbeat every 100 teams
-                if i % 100 == 0:
-                    print(f"    ↳ Inserted {i} / {len(teams)} (page {page})")
+            page += PAGE_BATCH
 
-            print(f"[PAGE {page}] ✅ Completed page ({total} total).")
-            page += 1
+    if failed_pages:
+        print(f"[WARN] Skipped pages {failed_pages}; they will be fetched again next run.")
+    if not changed_teams:
+        print(f"[DONE] {unchanged_pages} pages unchanged, nothing to update.")
+        return
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        total = await upsert_teams(conn, changed_teams)
+    finally:
+        await conn.close()
+        print("[INFO] Connection closed.")
 
-        print(f"[DONE] Inserted/updated {total} total teams.")
-    await conn.close()
-    print("[INFO] Connection closed.")
+    # Only remember Last-Modified once the rows are committed
+    STATE_FILE.write_text(json.dumps(new_state, indent=2))
+    print(f"[DONE] Inserted/updated {total} teams ({unchanged_pages} unchanged pages skipped).")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
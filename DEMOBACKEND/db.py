@@ -1,17 +1,23 @@
+import asyncio
+import functools
 import hashlib
 import asyncpg
-import json
 import time
 import logging
-from typing import Dict, Any, Optional, Callable, Annotated
+import orjson
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Callable, Annotated, AsyncIterator
 from fastapi import HTTPException, Header, Depends
 from datetime import datetime, timezone
 import uuid
 from asyncpg import PostgresError
 from asyncpg.exceptions import UniqueViolationError
 import enums
+from calculators.Reefscape_Scoring import points_sql
 import os, ssl
 import certifi
+from urllib.parse import urlparse
 
 # ---------- Logging ----------
 logging.basicConfig(level=logging.INFO)
@@ -20,45 +26,232 @@ logger = logging.getLogger(__name__)
 # ---------- PostgreSQL settings (single DB) ----------
 DB_DSN = os.getenv("DATABASE_URL")
 _pools: dict[str, asyncpg.Pool] = {}
+_pool_lock = asyncio.Lock()
+_pool_metrics: dict[str, dict[str, float]] = {}
+_request_conn: ContextVar[Optional[asyncpg.Connection]] = ContextVar("request_conn", default=None)
 DB_NAME = "data"
 
 
 S_NONE = "__NONE__"  # sentinel stored when scouter is logically NULL
 
 
+_JSONB_VERSION = b"\x01"  # binary jsonb wire format: version byte + JSON text
+
+
+def _json_dumps(value: Any) -> bytes:
+    # OPT_NON_STR_KEYS: int dict keys become strings, like json.dumps
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _jsonb_encode(value: Any) -> bytes:
+    return _JSONB_VERSION + _json_dumps(value)
+
+
+def _jsonb_decode(data: bytes) -> Any:
+    return orjson.loads(memoryview(data)[1:])  # skip the version byte without copying
+
+
 async def _setup_codecs(conn: asyncpg.Connection):
-    """Register JSON and JSONB codecs for transparent dict <-> JSON conversion."""
-    await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
-    await conn.set_type_codec("json",  encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+    """
+    Register JSON and JSONB codecs for transparent dict <-> JSON conversion.
+    Uses orjson over the binary protocol, so payloads go straight between bytes
+    and Python objects without an intermediate str.
+    """
+    await conn.set_type_codec("jsonb", encoder=_jsonb_encode, decoder=_jsonb_decode, schema="pg_catalog", format="binary")
+    await conn.set_type_codec("json",  encoder=_json_dumps, decoder=orjson.loads, schema="pg_catalog", format="binary")
+
+
+# =================== Scouting queries ===================
+
+_FILTER_SQL = {
+    "match": "match = {}",
+    "match_type": "match_type = {}",
+    "team": "team = {}",
+    "scouter": "scouter = {}",
+    "scouters": "scouter = ANY({})",
+    "statuses": "status = ANY({})",
+}
+# Columns per table, with and without the JSONB data column
+_COLUMNS = {
+    ("match_scouting", True): "event_key, match, match_type, team, alliance, scouter, status, data, last_modified",
+    ("match_scouting", False): "event_key, match, match_type, team, alliance, scouter, status, last_modified",
+    ("pit_scouting", True): "event_key, team, scouter, status, data, last_modified",
+    ("pit_scouting", False): "event_key, team, scouter, status, last_modified",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _scouting_sql(table: str, include_data: bool, filters: tuple[str, ...], include_masks: bool = False) -> str:
+    """
+    SELECT for one projection/filter combination, scoped to current_event; filters bind $1..$n in order.
+    Each combination always yields the same text, so asyncpg's statement cache (when enabled) reuses its plan.
+    """
+    where = "".join(" AND " + _FILTER_SQL[f].format(f"${i}") for i, f in enumerate(filters, 1))
+    columns = _COLUMNS[table, include_data] + ("".join(f", {c}" for c in _BRANCH_MASK_COLUMNS) if include_masks else "")
+    return (
+        f"SELECT {columns} FROM {table} "
+        f"WHERE event_key = (SELECT current_event FROM metadata LIMIT 1){where}"
+    )
+
+
+# Named scouting lookups issued by the endpoints and the analytics worker, as
+# _scouting_sql(table, include_data, filters, include_masks) arguments
+_STATEMENTS: dict[str, tuple[str, bool, tuple[str, ...], bool]] = {
+    "match_list": ("match_scouting", False, (), False),
+    "match_by_scouters": ("match_scouting", False, ("scouters",), False),
+    "match_by_statuses": ("match_scouting", False, ("statuses",), False),
+    "match_by_scouters_statuses": ("match_scouting", False, ("scouters", "statuses"), False),
+    "match_submitted_masks": ("match_scouting", True, ("statuses",), True),
+    "match_entries": ("match_scouting", False, ("match", "match_type"), False),
+    "match_entries_data": ("match_scouting", True, ("match",), False),
+    "match_slot": ("match_scouting", False, ("match", "match_type", "team"), False),
+    "match_slot_scouter": ("match_scouting", False, ("match", "match_type", "team", "scouter"), False),
+    "pit_list": ("pit_scouting", False, (), False),
+    "pit_team": ("pit_scouting", True, ("team",), False),
+    "pit_team_meta": ("pit_scouting", False, ("team",), False),
+}
+
+
+async def _prepare_statements(conn: asyncpg.Connection):
+    """
+    Prepare every _STATEMENTS entry on a new pool connection. asyncpg keeps each as a
+    named server-side statement in its statement cache, keyed by the query text, so
+    later fetches with the same _scouting_sql text only bind parameters.
+    """
+    try:
+        for args in _STATEMENTS.values():
+            # executemany with no rows prepares and caches the statement without running it
+            await conn.executemany(_scouting_sql(*args), [])
+    except (asyncpg.UndefinedTableError, asyncpg.UndefinedColumnError):
+        # Fresh database: tables are created after the pool starts; statements are cached on first use
+        pass
+
+
+def _pool_settings(dsn: str) -> Dict[str, Any]:
+    """
+    Pool options from the environment (read at pool creation, after load_dotenv):
+      DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE  - connections kept open / upper bound
+      DB_POOL_MAX_IDLE                     - seconds before an idle connection is closed
+      DB_STATEMENT_CACHE_SIZE              - asyncpg prepared statement cache per connection
+    pgbouncer (Neon's "-pooler" endpoints) in transaction mode does not keep named
+    prepared statements on the same server connection, so the cache defaults to 0 there
+    and queries run as unnamed statements. The _STATEMENTS registry is prepared on each
+    new connection only when the cache can hold all of it.
+    """
+    pgbouncer = "-pooler" in (urlparse(dsn).hostname or "")
+    return {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+        "max_inactive_connection_lifetime": float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+        "statement_cache_size": int(os.getenv("DB_STATEMENT_CACHE_SIZE", 0 if pgbouncer else 100)),
+    }
+
+
+async def _init_connection(conn: asyncpg.Connection, prepare: bool):
+    """Pool init hook: register codecs, then prepare the statement registry when enabled."""
+    await _setup_codecs(conn)
+    if prepare:
+        await _prepare_statements(conn)
+
+
+async def init_pool(db: str = DB_NAME) -> asyncpg.Pool:
+    """
+    Create the pool for the given database if it does not exist yet.
+    asyncpg opens min_size connections up front, so calling this at startup
+    warms the pool before the first request.
+    Uses DATABASE_URL from environment and SSL (for Neon).
+    """
+    async with _pool_lock:
+        pool = _pools.get(db)
+        if pool is None:
+            dsn = os.getenv("DATABASE_URL")
+            if not dsn:
+                raise RuntimeError("DATABASE_URL not set in environment")
+            settings = _pool_settings(dsn)
+            prepare = settings["statement_cache_size"] >= len(_STATEMENTS)
+            pool = await asyncpg.create_pool(
+                dsn=dsn,
+                init=functools.partial(_init_connection, prepare=prepare),
+                ssl=ssl.create_default_context(cafile=certifi.where()),  # Neon requires SSL
+                **settings,
+            )
+            _pools[db] = pool
+            _pool_metrics[db] = {
+                "acquires": 0, "acquire_timeouts": 0, "in_use": 0,
+                "wait_total_ms": 0.0, "wait_max_ms": 0.0,
+                "statement_cache_size": settings["statement_cache_size"],
+                "prepared_statements": len(_STATEMENTS) if prepare else 0,
+            }
+            logger.info("Created pool for %s: %s", db, settings)
+        return pool
 
 
 async def get_db_connection(db: str) -> asyncpg.Connection:
     """
     Acquire a connection from a cached pool for the given database.
+    Inside a connection() scope (e.g. a request) the scope's connection is returned instead.
     Lazily creates a pool if not already initialized.
-    Uses DATABASE_URL from environment and SSL (for Neon).
+    Raises 503 if no connection frees up within DB_POOL_ACQUIRE_TIMEOUT seconds.
     """
-    pool = _pools.get(db)
-    if pool is None:
-        dsn = os.getenv("DATABASE_URL")
-        if not dsn:
-            raise RuntimeError("DATABASE_URL not set in environment")
-        pool = await asyncpg.create_pool(
-            dsn=dsn,
-            min_size=1,
-            max_size=10,
-            init=_setup_codecs,
-            ssl=ssl.create_default_context(cafile=certifi.where()),  # Neon requires SSL
-        )
-        _pools[db] = pool
-    return await pool.acquire()
+    shared = _request_conn.get()
+    if shared is not None:
+        return shared
+
+    pool = _pools.get(db) or await init_pool(db)
+    metrics = _pool_metrics[db]
+
+    start = time.perf_counter()
+    try:
+        conn = await pool.acquire(timeout=float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", 10)))
+    except asyncio.TimeoutError:
+        metrics["acquire_timeouts"] += 1
+        logger.error("Timed out acquiring a connection for %s", db)
+        raise HTTPException(status_code=503, detail="Database busy, try again")
+
+    wait_ms = (time.perf_counter() - start) * 1000
+    metrics["acquires"] += 1
+    metrics["in_use"] += 1
+    metrics["wait_total_ms"] += wait_ms
+    metrics["wait_max_ms"] = max(metrics["wait_max_ms"], wait_ms)
+    return conn
 
 
 async def release_db_connection(db: str, conn: asyncpg.Connection):
-    """Release a connection back to its pool."""
+    """Release a connection back to its pool (no-op for the connection() scope's shared connection)."""
+    if conn is _request_conn.get():
+        return
     pool = _pools.get(db)
     if pool is not None:
         await pool.release(conn)
+        _pool_metrics[db]["in_use"] -= 1
+
+
+@asynccontextmanager
+async def connection(db: str = DB_NAME) -> AsyncIterator[asyncpg.Connection]:
+    """
+    Share one pooled connection with every db call made inside the block.
+    Nested scopes reuse the outer connection. Calls sharing it must run sequentially
+    (asyncpg connections do not allow concurrent queries).
+    """
+    shared = _request_conn.get()
+    if shared is not None:
+        yield shared
+        return
+
+    conn = await get_db_connection(db)
+    token = _request_conn.set(conn)
+    try:
+        yield conn
+    finally:
+        _request_conn.reset(token)
+        await release_db_connection(db, conn)
+
+
+@asynccontextmanager
+async def transaction(db: str = DB_NAME) -> AsyncIterator[asyncpg.Connection]:
+    """Run every db call inside the block in one transaction on the shared connection."""
+    async with connection(db) as conn, conn.transaction():
+        yield conn
 
 
 async def close_pool():
@@ -66,6 +259,28 @@ async def close_pool():
     for pool in _pools.values():
         await pool.close()
     _pools.clear()
+    _pool_metrics.clear()
+
+
+def get_pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of size, idle and acquire statistics for every open pool."""
+    result = {}
+    for db, pool in _pools.items():
+        metrics = _pool_metrics[db]
+        result[db] = {
+            "size": pool.get_size(),
+            "idle": pool.get_idle_size(),
+            "min_size": pool.get_min_size(),
+            "max_size": pool.get_max_size(),
+            "in_use": int(metrics["in_use"]),
+            "acquires": int(metrics["acquires"]),
+            "acquire_timeouts": int(metrics["acquire_timeouts"]),
+            "wait_avg_ms": round(metrics["wait_total_ms"] / metrics["acquires"], 3) if metrics["acquires"] else 0.0,
+            "wait_max_ms": round(metrics["wait_max_ms"], 3),
+            "statement_cache_size": int(metrics["statement_cache_size"]),
+            "prepared_statements": int(metrics["prepared_statements"]),
+        }
+    return result
 
 
 def _to_db_scouter(s: Optional[str]) -> str:
@@ -80,12 +295,252 @@ def _from_db_scouter(s: str) -> Optional[str]:
 
 # =================== Schema Init ===================
 
+# Stored generated columns over frequently aggregated JSONB fields, so analytics can
+# filter and aggregate in SQL. NULL when the field is missing or has the wrong type.
+_MS_GENERATED_COLUMNS = {
+    **{
+        f"{phase}_l1": ("INTEGER", f"ms_int(data->'{phase}'->'l1')")
+        for phase in ("auto", "teleop")
+    },
+    **{
+        f"{phase}_l{lvl + 2}": ("INTEGER", f"ms_branch_count(data->'{phase}'->'branchPlacement', {lvl})")
+        for phase in ("auto", "teleop")
+        for lvl in range(3)
+    },
+    **{
+        f"{phase}_{field}": ("INTEGER", f"ms_int(data->'{phase}'->'{field}')")
+        for phase in ("auto", "teleop")
+        for field in ("processor", "barge")
+    },
+    "auto_moved": ("BOOLEAN", "ms_bool(data->'auto'->'moved')"),
+    "climb_success": ("BOOLEAN", "ms_bool(data->'postmatch'->'climbSuccess')"),
+    "climb_speed": ("DOUBLE PRECISION", "ms_float(data->'postmatch'->'climbSpeed')"),
+    # Packed 36-bit branchPlacement (NULL when nothing was reported), read by Scoring_Habits
+    **{
+        f"{phase}_branch_mask": ("BIGINT", f"ms_branch_mask(data->'{phase}'->'branchPlacement')")
+        for phase in ("auto", "teleop")
+    },
+}
+_BRANCH_MASK_COLUMNS = ("auto_branch_mask", "teleop_branch_mask")
+
+
+async def _migrate_match_scouting(conn: asyncpg.Connection):
+    """
+    Idempotent schema upgrades for match_scouting (runs inside init_data_db's transaction):
+      - (event_key, status, match_type, match) index for current-event/status scans
+      - drops idx_ms_lookup, which duplicated the primary key
+      - generated columns from _MS_GENERATED_COLUMNS
+    """
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_ms_event_status
+        ON match_scouting (event_key, status, match_type, match)
+    """)
+    await conn.execute("DROP INDEX IF EXISTS idx_ms_lookup")
+
+    # Generated columns need IMMUTABLE expressions; these never raise on odd payloads
+    # (wrong types and out-of-range numbers give NULL), so a malformed submission can't
+    # block the write. The nested CASEs make sure the type check runs before any cast.
+    await conn.execute("""
+        CREATE OR REPLACE FUNCTION ms_int(v JSONB) RETURNS INTEGER
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT CASE WHEN jsonb_typeof(v) = 'number' THEN
+                CASE WHEN round(v::numeric) BETWEEN -2147483648 AND 2147483647
+                     THEN round(v::numeric)::integer END
+            END
+        $$;
+        CREATE OR REPLACE FUNCTION ms_float(v JSONB) RETURNS DOUBLE PRECISION
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT CASE WHEN jsonb_typeof(v) = 'number' THEN
+                CASE WHEN abs(v::numeric) < 1e308 THEN v::numeric::double precision END
+            END
+        $$;
+        CREATE OR REPLACE FUNCTION ms_bool(v JSONB) RETURNS BOOLEAN
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT CASE WHEN jsonb_typeof(v) = 'boolean' THEN v::boolean END
+        $$;
+        -- Filled branches at level lvl (0=l2, 1=l3, 2=l4), for the dict or the packed
+        -- 36-bit int form of branchPlacement (see calculators/Branch_Bitmask.py);
+        -- numbers outside the 36-bit range give NULL
+        CREATE OR REPLACE FUNCTION ms_branch_count(bp JSONB, lvl INTEGER) RETURNS INTEGER
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT CASE jsonb_typeof(bp)
+                WHEN 'number' THEN
+                    CASE WHEN round(bp::numeric) BETWEEN 0 AND 68719476735 THEN
+                        length(replace((round(bp::numeric)::bigint >> (12 * lvl))::bit(12)::text, '0', ''))
+                    END
+                WHEN 'object' THEN
+                    (SELECT count(*)::integer FROM jsonb_each(bp) AS b(branch, levels)
+                     WHERE levels->>('l' || (lvl + 2)) = 'true')
+            END
+        $$;
+        -- branchPlacement packed to its 36-bit int; NULL for an empty dict, a non-placement
+        -- value or a number outside the 36-bit range
+        CREATE OR REPLACE FUNCTION ms_branch_mask(bp JSONB) RETURNS BIGINT
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT CASE jsonb_typeof(bp)
+                WHEN 'number' THEN
+                    CASE WHEN round(bp::numeric) BETWEEN 0 AND 68719476735 THEN round(bp::numeric)::bigint END
+                WHEN 'object' THEN
+                    CASE WHEN bp <> '{}'::jsonb THEN
+                        (SELECT coalesce(bit_or(1::bigint << (12 * lvl + strpos('ABCDEFGHIJKL', b.branch) - 1)), 0)
+                         FROM jsonb_each(bp) AS b(branch, levels), generate_series(0, 2) AS lvl
+                         WHERE length(b.branch) = 1 AND strpos('ABCDEFGHIJKL', b.branch) > 0
+                           AND b.levels->>('l' || (lvl + 2)) = 'true')
+                    END
+            END
+        $$;
+    """)
+    # One ALTER so existing tables are rewritten once
+    await conn.execute(
+        "ALTER TABLE match_scouting "
+        + ", ".join(
+            f"ADD COLUMN IF NOT EXISTS {name} {sql_type} GENERATED ALWAYS AS ({expr}) STORED"
+            for name, (sql_type, expr) in _MS_GENERATED_COLUMNS.items()
+        )
+    )
+
+
+# Per-phase points summed into team_summary / match_alliance_summary
+_SUMMARY_PHASES = ("auto", "teleop", "climb", "total")
+
+
+def _summary_points(row: str) -> dict[str, str]:
+    points = points_sql(row)
+    return points | {"total": " + ".join(f"({expr})" for expr in points.values())}
+
+
+async def _create_summaries(conn: asyncpg.Connection):
+    """
+    Trigger-maintained summaries of submitted match_scouting rows (scored with Reefscape_Scoring):
+      - team_summary: per event/team match count, climb successes, and per phase the sum and
+        sum of squares of points (enough for means and variances)
+      - match_alliance_summary: per event/match/alliance team count and point totals
+    Every row entering or leaving 'submitted' (or changing while submitted) applies its delta,
+    so submit_data keeps them current without recomputation; a team or alliance whose last
+    submitted row leaves is deleted rather than kept at zero. The tables are rebuilt here only
+    when they are new or the summary definition (scoring expressions included) changed since
+    the last build, as recorded in the team_summary table comment; otherwise a rebuild is
+    left to /admin/summary/rebuild.
+    """
+    phase_cols = ", ".join(f"{p}_sum DOUBLE PRECISION NOT NULL DEFAULT 0, {p}_sq DOUBLE PRECISION NOT NULL DEFAULT 0"
+                           for p in _SUMMARY_PHASES)
+    await conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS team_summary (
+            event_key TEXT NOT NULL,
+            team TEXT NOT NULL,
+            matches INTEGER NOT NULL DEFAULT 0,
+            climb_successes INTEGER NOT NULL DEFAULT 0,
+            {phase_cols},
+            PRIMARY KEY (event_key, team)
+        );
+        CREATE TABLE IF NOT EXISTS match_alliance_summary (
+            event_key TEXT NOT NULL,
+            match_type TEXT NOT NULL,
+            match INTEGER NOT NULL,
+            alliance TEXT NOT NULL,
+            teams INTEGER NOT NULL DEFAULT 0,
+            {", ".join(f"{p} DOUBLE PRECISION NOT NULL DEFAULT 0" for p in _SUMMARY_PHASES)},
+            PRIMARY KEY (event_key, match_type, match, alliance)
+        );
+    """)
+
+    points = _summary_points("r.")
+    functions = f"""
+        CREATE OR REPLACE FUNCTION ms_summary_apply(r match_scouting, sign INTEGER) RETURNS void
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            {" ".join(f"p_{p} DOUBLE PRECISION := {expr};" for p, expr in points.items())}
+        BEGIN
+            INSERT INTO team_summary AS t (event_key, team, matches, climb_successes,
+                                           {", ".join(f"{p}_sum, {p}_sq" for p in _SUMMARY_PHASES)})
+            VALUES (r.event_key, r.team, sign, sign * (r.climb_success IS TRUE)::int,
+                    {", ".join(f"sign * p_{p}, sign * p_{p} * p_{p}" for p in _SUMMARY_PHASES)})
+            ON CONFLICT (event_key, team) DO UPDATE SET
+                matches = t.matches + EXCLUDED.matches,
+                climb_successes = t.climb_successes + EXCLUDED.climb_successes,
+                {", ".join(f"{p}_sum = t.{p}_sum + EXCLUDED.{p}_sum, {p}_sq = t.{p}_sq + EXCLUDED.{p}_sq"
+                           for p in _SUMMARY_PHASES)};
+
+            INSERT INTO match_alliance_summary AS m (event_key, match_type, match, alliance, teams,
+                                                     {", ".join(_SUMMARY_PHASES)})
+            VALUES (r.event_key, r.match_type, r.match, r.alliance, sign,
+                    {", ".join(f"sign * p_{p}" for p in _SUMMARY_PHASES)})
+            ON CONFLICT (event_key, match_type, match, alliance) DO UPDATE SET
+                teams = m.teams + EXCLUDED.teams,
+                {", ".join(f"{p} = m.{p} + EXCLUDED.{p}" for p in _SUMMARY_PHASES)};
+
+            IF sign < 0 THEN
+                DELETE FROM team_summary
+                WHERE event_key = r.event_key AND team = r.team AND matches = 0;
+                DELETE FROM match_alliance_summary
+                WHERE event_key = r.event_key AND match_type = r.match_type
+                  AND match = r.match AND alliance = r.alliance AND teams = 0;
+            END IF;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION ms_summary_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' AND OLD.status = 'submitted' THEN
+                PERFORM ms_summary_apply(OLD, -1);
+            END IF;
+            IF TG_OP <> 'DELETE' AND NEW.status = 'submitted' THEN
+                PERFORM ms_summary_apply(NEW, 1);
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        DROP TRIGGER IF EXISTS ms_summary_ins_del ON match_scouting;
+        CREATE TRIGGER ms_summary_ins_del AFTER INSERT OR DELETE ON match_scouting
+            FOR EACH ROW EXECUTE FUNCTION ms_summary_trigger();
+        DROP TRIGGER IF EXISTS ms_summary_upd ON match_scouting;
+        CREATE TRIGGER ms_summary_upd AFTER UPDATE ON match_scouting
+            FOR EACH ROW WHEN (OLD.status = 'submitted' OR NEW.status = 'submitted')
+            EXECUTE FUNCTION ms_summary_trigger();
+    """
+    await conn.execute(functions)
+
+    version = "summary " + hashlib.md5(functions.encode()).hexdigest()
+    if await conn.fetchval("SELECT obj_description('team_summary'::regclass, 'pg_class')") != version:
+        await _rebuild_summaries(conn)
+        await conn.execute(f"COMMENT ON TABLE team_summary IS '{version}'")
+
+
+async def _rebuild_summaries(conn: asyncpg.Connection):
+    """Recompute both summary tables from the submitted rows (same transaction as the caller)."""
+    points = _summary_points("")
+    await conn.execute(f"""
+        TRUNCATE team_summary, match_alliance_summary;
+
+        WITH scored AS (
+            SELECT event_key, team, match_type, match, alliance, climb_success,
+                   {", ".join(f"({expr})::float8 AS {p}" for p, expr in points.items())}
+            FROM match_scouting
+            WHERE status = 'submitted'
+        ), teams AS (
+            INSERT INTO team_summary (event_key, team, matches, climb_successes,
+                                      {", ".join(f"{p}_sum, {p}_sq" for p in _SUMMARY_PHASES)})
+            SELECT event_key, team, count(*), count(*) FILTER (WHERE climb_success),
+                   {", ".join(f"sum({p}), sum({p} * {p})" for p in _SUMMARY_PHASES)}
+            FROM scored
+            GROUP BY event_key, team
+        )
+        INSERT INTO match_alliance_summary (event_key, match_type, match, alliance, teams,
+                                            {", ".join(_SUMMARY_PHASES)})
+        SELECT event_key, match_type, match, alliance, count(*),
+               {", ".join(f"sum({p})" for p in _SUMMARY_PHASES)}
+        FROM scored
+        GROUP BY event_key, match_type, match, alliance;
+    """)
+
+
 async def init_data_db():
     """
     Initialize tables in the 'data' database:
       - match_scouting
       - pit_scouting
       - processed_data
+      - analytics_index
       - users
     Creates indices if missing.
     """
@@ -108,10 +563,8 @@ async def init_data_db():
                 )
             """)
             await conn.execute("CREATE INDEX IF NOT EXISTS idx_match_scouting_team ON match_scouting (team)")
-            await conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_ms_lookup
-                ON match_scouting (match, match_type, team, scouter)
-            """)
+            await _migrate_match_scouting(conn)
+            await _create_summaries(conn)
 
             # --- pit_scouting table ---
             await conn.execute("""
@@ -134,6 +587,16 @@ async def init_data_db():
             # --- processed_data table ---
             await conn.execute("CREATE TABLE IF NOT EXISTS processed_data (data TEXT)")
 
+            # --- analytics_index table (analytics worker output, read by search_index) ---
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS analytics_index (
+                    event_key TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+                )
+            """)
+
             # --- users table ---
             await conn.execute("""
                 CREATE TABLE IF NOT EXISTS users(
@@ -287,6 +750,87 @@ async def add_match_scouting(
         await release_db_connection(DB_NAME, conn)
 
 
+async def bootstrap_event(
+    event_key: str,
+    matches: list[Dict[str, Any]],
+    teams: list[Dict[str, Any]],
+) -> Dict[str, int]:
+    """
+    Idempotently initialize an event in a single transaction:
+      - upserts every team into `teams`
+      - upserts the match schedule into `matches`
+      - creates an UNCLAIMED match_scouting row for every (match, team) that has none yet
+    Rows are written in batches with executemany, so the whole event costs a
+    handful of round trips instead of one connection acquire per row.
+
+    Each match is a dict with match_type, match_number, set_number, scheduled_time,
+    red and blue (lists of 3 team numbers); each team has team_number, nickname, rookie_year.
+    """
+    now = datetime.now()
+    team_records = [
+        (t["team_number"], t.get("nickname") or "Unknown", t.get("rookie_year"), now)
+        for t in teams
+    ]
+    match_records = [
+        (
+            f"{event_key}_{m['match_type']}{m['match_number']}", event_key, m["match_type"],
+            m["match_number"], m.get("set_number", 1), m.get("scheduled_time"),
+            *m["red"], *m["blue"],
+        )
+        for m in matches
+    ]
+    scouting_records = [
+        (event_key, m["match_number"], m["match_type"], str(team), alliance.value,
+         S_NONE, enums.StatusType.UNCLAIMED.value, {}, time.time_ns())
+        for m in matches
+        for alliance in enums.AllianceType
+        for team in m[alliance.value]
+    ]
+
+    conn = await get_db_connection(DB_NAME)
+    try:
+        async with conn.transaction():
+            await conn.executemany("""
+                INSERT INTO teams (team_number, nickname, rookie_year, last_updated)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (team_number) DO UPDATE
+                SET nickname = EXCLUDED.nickname,
+                    rookie_year = EXCLUDED.rookie_year,
+                    last_updated = EXCLUDED.last_updated
+            """, team_records)
+
+            await conn.executemany("""
+                INSERT INTO matches (
+                    key, event_key, match_type, match_number, set_number, scheduled_time,
+                    red1, red2, red3, blue1, blue2, blue3
+                )
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+                ON CONFLICT (event_key, match_type, match_number) DO UPDATE
+                SET scheduled_time = EXCLUDED.scheduled_time,
+                    red1 = EXCLUDED.red1, red2 = EXCLUDED.red2, red3 = EXCLUDED.red3,
+                    blue1 = EXCLUDED.blue1, blue2 = EXCLUDED.blue2, blue3 = EXCLUDED.blue3
+            """, match_records)
+
+            # Skip teams that already have a row for this match, whoever holds the claim
+            await conn.executemany("""
+                INSERT INTO match_scouting (
+                    event_key, match, match_type, team, alliance, scouter, status, data, last_modified
+                )
+                SELECT $1::text, $2::int, $3::text, $4::text, $5::text, $6::text, $7::text, $8::jsonb, $9::bigint
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM match_scouting
+                    WHERE event_key = $1 AND match = $2 AND match_type = $3 AND team = $4
+                )
+            """, scouting_records)
+    except PostgresError as e:
+        logger.error("Failed to bootstrap event %s: %s", event_key, e)
+        raise HTTPException(status_code=500, detail=f"Failed to bootstrap event: {e}")
+    finally:
+        await release_db_connection(DB_NAME, conn)
+
+    return {"teams": len(team_records), "matches": len(match_records), "match_scouting": len(scouting_records)}
+
+
 async def update_match_scouting(
     match: int,
     m_type: enums.MatchType,
@@ -340,43 +884,43 @@ async def get_match_scouting(
     m_type: Optional[enums.MatchType] = None,
     team: Optional[int | str] = None,
     scouter: Optional[str] = "__NOTPASSED__",
+    scouters: Optional[list[str]] = None,
+    statuses: Optional[list[enums.StatusType]] = None,
+    include_data: bool = True,
+    include_masks: bool = False,
 ) -> list[Dict[str, Any]]:
     """
     Fetch match scouting records scoped by current_event from metadata.
-    Any combination of parameters can be supplied.
+    Any combination of parameters can be supplied. scouters/statuses keep rows
+    matching any listed value (filtered in SQL; empty or None means no filter).
+    With include_data=False the JSONB data column is neither fetched nor decoded
+    and records have no "data" key. include_masks adds the packed branchPlacement
+    generated columns (auto_branch_mask, teleop_branch_mask).
     """
     conn = await get_db_connection(DB_NAME)
     try:
-        query = """
-            SELECT *
-            FROM match_scouting
-            WHERE event_key = (SELECT current_event FROM metadata LIMIT 1)
-        """
+        filters: list[str] = []
         params: list[Any] = []
-        idx = 1
 
         if match is not None:
-            query += f" AND match = ${idx}"; params.append(match); idx += 1
+            filters.append("match"); params.append(match)
         if m_type is not None:
-            query += f" AND match_type = ${idx}"; params.append(m_type.value); idx += 1
+            filters.append("match_type"); params.append(m_type.value)
         if team is not None:
-            query += f" AND team = ${idx}"; params.append(str(team)); idx += 1
+            filters.append("team"); params.append(str(team))
         if scouter != "__NOTPASSED__":
-            query += f" AND scouter = ${idx}"; params.append(_to_db_scouter(scouter if scouter != "" else None)); idx += 1
+            filters.append("scouter"); params.append(_to_db_scouter(scouter if scouter != "" else None))
+        if scouters:
+            filters.append("scouters"); params.append(list(scouters))
+        if statuses:
+            filters.append("statuses"); params.append([enums.StatusType(s).value for s in statuses])
 
-        rows = await conn.fetch(query, *params)
+        rows = await conn.fetch(_scouting_sql("match_scouting", include_data, tuple(filters), include_masks), *params)
 
         return [
             {
-                "event_key": r["event_key"],
-                "match": r["match"],
-                "match_type": r["match_type"],
-                "team": r["team"],
-                "alliance": r["alliance"],
+                **dict(r),
                 "scouter": _from_db_scouter(r["scouter"]),
-                "status": r["status"],
-                "data": r["data"],
-                "last_modified": r["last_modified"],
             }
             for r in rows
         ]
@@ -387,6 +931,46 @@ async def get_match_scouting(
         await release_db_connection(DB_NAME, conn)
 
 
+async def get_match_schedule() -> list[Dict[str, Any]]:
+    """Every scheduled match of the current event with its six team slots (red1..blue3)."""
+    conn = await get_db_connection(DB_NAME)
+    try:
+        rows = await conn.fetch("""
+            SELECT match_type, match_number, red1, red2, red3, blue1, blue2, blue3
+            FROM matches
+            WHERE event_key = (SELECT current_event FROM metadata LIMIT 1)
+            ORDER BY match_type, match_number
+        """)
+        return [dict(r) for r in rows]
+    except PostgresError as e:
+        logger.error("Failed to fetch match schedule: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to fetch match schedule: {e}")
+    finally:
+        await release_db_connection(DB_NAME, conn)
+
+
+async def get_scouting_counts(statuses: Optional[list[enums.StatusType]] = None) -> list[Dict[str, Any]]:
+    """
+    Current-event match_scouting rows as their keys plus the generated count columns
+    (_MS_GENERATED_COLUMNS), so per-field checks need no JSONB decoding.
+    """
+    columns = ", ".join(_MS_GENERATED_COLUMNS)
+    conn = await get_db_connection(DB_NAME)
+    try:
+        rows = await conn.fetch(f"""
+            SELECT match_type, match, team, alliance, scouter, status, {columns}
+            FROM match_scouting
+            WHERE event_key = (SELECT current_event FROM metadata LIMIT 1)
+              AND ($1::text[] IS NULL OR status = ANY($1))
+        """, [enums.StatusType(s).value for s in statuses] if statuses else None)
+        return [{**dict(r), "scouter": _from_db_scouter(r["scouter"])} for r in rows]
+    except PostgresError as e:
+        logger.error("Failed to fetch scouting counts: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to fetch scouting counts: {e}")
+    finally:
+        await release_db_connection(DB_NAME, conn)
+
+
 async def get_processed_data() -> Optional[str]:
     """Retrieve the processed data text blob (first row only)."""
     conn = await get_db_connection(DB_NAME)
@@ -400,6 +984,123 @@ async def get_processed_data() -> Optional[str]:
         await release_db_connection(DB_NAME, conn)
 
 
+async def get_analytics_index() -> Optional[tuple[str, str]]:
+    """(index JSON, digest) the analytics worker published for the current event, or None."""
+    conn = await get_db_connection(DB_NAME)
+    try:
+        row = await conn.fetchrow("""
+            SELECT data, digest FROM analytics_index
+            WHERE event_key = (SELECT current_event FROM metadata LIMIT 1)
+        """)
+        return (row["data"], row["digest"]) if row else None
+    except PostgresError as e:
+        logger.error("Failed to fetch analytics index: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to fetch analytics index: {e}")
+    finally:
+        await release_db_connection(DB_NAME, conn)
+
+
+async def get_analytics_index_digest() -> Optional[str]:
+    """md5 of the current event's published analytics index (cheap change check), or None."""
+    conn = await get_db_connection(DB_NAME)
+    try:
+        return await conn.fetchval("""
+            SELECT digest FROM analytics_index
+            WHERE event_key = (SELECT current_event FROM metadata LIMIT 1)
+        """)
+    except PostgresError as e:
+        logger.error("Failed to fetch analytics index digest: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to fetch analytics index digest: {e}")
+    finally:
+        await release_db_connection(DB_NAME, conn)
+
+
+async def set_analytics_index(data: str):
+    """Publish the analytics index for the current event (processed_data is left to calculator.py)."""
+    conn = await get_db_connection(DB_NAME)
+    try:
+        await conn.execute("""
+            INSERT INTO analytics_index (event_key, data, digest)
+            VALUES ((SELECT current_event FROM metadata LIMIT 1), $1, md5($1))
+            ON CONFLICT (event_key) DO UPDATE
+            SET data = EXCLUDED.data, digest = EXCLUDED.digest, updated_at = now()
+        """, data)
+    except PostgresError as e:
+        logger.error("Failed to store analytics index: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to store analytics index: {e}")
+    finally:
+        await release_db_connection(DB_NAME, conn)
+
+
+# =================== Summaries ===================
+
+def _team_summary_dict(r: asyncpg.Record) -> Dict[str, Any]:
+    """Means and sample variances per phase from a team_summary row's sums."""
+    n = r["matches"]
+    out: Dict[str, Any] = {"team": r["team"], "matches": n, "climb_rate": round(r["climb_successes"] / n, 3)}
+    for p in _SUMMARY_PHASES:
+        mean = r[f"{p}_sum"] / n
+        var = (r[f"{p}_sq"] - n * mean * mean) / (n - 1) if n > 1 else None
+        out[p] = {"mean": round(mean, 3), "var": round(max(var, 0.0), 3) if var is not None else None}
+    return out
+
+
+async def get_team_summary(team: int | str) -> Optional[Dict[str, Any]]:
+    """Precomputed heuristic summary for one team at the current event, or None if nothing is submitted."""
+    conn = await get_db_connection(DB_NAME)
+    try:
+        row = await conn.fetchrow("""
+            SELECT * FROM team_summary
+            WHERE event_key = (SELECT current_event FROM metadata LIMIT 1)
+              AND team = $1 AND matches > 0
+        """, str(team))
+        return _team_summary_dict(row) if row else None
+    except PostgresError as e:
+        logger.error("Failed to fetch team summary: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to fetch team summary: {e}")
+    finally:
+        await release_db_connection(DB_NAME, conn)
+
+
+async def get_event_summary() -> Dict[str, list[Dict[str, Any]]]:
+    """Precomputed per-team and per-match-alliance totals for the current event."""
+    conn = await get_db_connection(DB_NAME)
+    try:
+        teams = await conn.fetch("""
+            SELECT * FROM team_summary
+            WHERE event_key = (SELECT current_event FROM metadata LIMIT 1) AND matches > 0
+            ORDER BY team
+        """)
+        alliances = await conn.fetch(f"""
+            SELECT match_type, match, alliance, teams, {", ".join(_SUMMARY_PHASES)}
+            FROM match_alliance_summary
+            WHERE event_key = (SELECT current_event FROM metadata LIMIT 1) AND teams > 0
+            ORDER BY match_type, match, alliance
+        """)
+        return {
+            "teams": [_team_summary_dict(r) for r in teams],
+            "matches": [dict(r) for r in alliances],
+        }
+    except PostgresError as e:
+        logger.error("Failed to fetch event summary: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to fetch event summary: {e}")
+    finally:
+        await release_db_connection(DB_NAME, conn)
+
+
+async def rebuild_summaries():
+    """Recompute the summary tables from match_scouting (e.g. after bulk edits with triggers disabled)."""
+    conn = await get_db_connection(DB_NAME)
+    try:
+        async with conn.transaction():
+            await _rebuild_summaries(conn)
+    except PostgresError as e:
+        logger.error("Failed to rebuild summaries: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild summaries: {e}")
+    finally:
+        await release_db_connection(DB_NAME, conn)
+
+
 # =================== Pit Scouting ===================
 
 async def add_pit_scouting(
@@ -478,36 +1179,29 @@ async def update_pit_scouting(
 async def get_pit_scouting(
     team: Optional[int | str] = None,
     scouter: Optional[str] = "__NOTPASSED__",
+    include_data: bool = True,
 ) -> list[Dict[str, Any]]:
     """
     Fetch pit scouting records scoped by current_event from metadata.
     Any combination of parameters can be supplied.
+    With include_data=False the JSONB data column is skipped (no "data" key).
     """
     conn = await get_db_connection(DB_NAME)
     try:
-        query = """
-            SELECT *
-            FROM pit_scouting
-            WHERE event_key = (SELECT current_event FROM metadata LIMIT 1)
-        """
+        filters: list[str] = []
         params: list[Any] = []
-        idx = 1
 
         if team is not None:
-            query += f" AND team = ${idx}"; params.append(str(team)); idx += 1
+            filters.append("team"); params.append(str(team))
         if scouter != "__NOTPASSED__":
-            query += f" AND scouter = ${idx}"; params.append(_to_db_scouter(scouter if scouter != "" else None)); idx += 1
+            filters.append("scouter"); params.append(_to_db_scouter(scouter if scouter != "" else None))
 
-        rows = await conn.fetch(query, *params)
+        rows = await conn.fetch(_scouting_sql("pit_scouting", include_data, tuple(filters)), *params)
 
         return [
             {
-                "event_key": r["event_key"],
-                "team": r["team"],
+                **dict(r),
                 "scouter": _from_db_scouter(r["scouter"]),
-                "status": r["status"],
-                "data": r["data"],
-                "last_modified": r["last_modified"],
             }
             for r in rows
         ]
@@ -670,9 +1364,23 @@ async def get_user_by_passcode(passcode: str) -> Optional[dict]:
 
 # =================== FastAPI dependencies ===================
 
+async def request_connection() -> AsyncIterator[None]:
+    """
+    FastAPI dependency: hold one pooled connection for the whole request, so every
+    db call in the handler (and in its auth dependency) reuses it instead of
+    acquiring and releasing its own. Opt in per route with
+    dependencies=[Depends(db.request_connection)], and only on handlers that make several
+    short db calls: the connection stays checked out while the handler awaits anything else.
+    """
+    async with connection():
+        yield
+
+
 def require_session() -> Callable[..., "SessionInfo"]:
     """FastAPI dependency: verifies the X-UUID header and returns a SessionInfo object."""
-    async def dep(x_uuid: Annotated[str, Header(alias="x-uuid")]) -> enums.SessionInfo:
+    async def dep(
+        x_uuid: Annotated[str, Header(alias="x-uuid")],
+    ) -> enums.SessionInfo:
         s = await verify_uuid(x_uuid)
         return enums.SessionInfo(
             name=s["name"],
@@ -2,11 +2,18 @@ import uuid
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, Any
 from fastapi import Depends, HTTPException, Body, APIRouter, Request, Query
+from fastapi.responses import ORJSONResponse
 from starlette.responses import HTMLResponse
+import analytics
 import db
 import enums
+import search_index
+import tba_fetcher
+from calculators.Branch_Bitmask import pack_phases
+from calculators.Match_Coverage import coverage_report
+from calculators.Scouting_Validation import LIVE_RULES, frame_from_columns, summarize, validate
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 @router.get("/", response_class=HTMLResponse)
@@ -169,16 +176,10 @@ async def admin_filter_matches(
     Returns match entries (no data field) filtered by lists of scouters and/or statuses.
     Requires admin permission.
     """
-    rows = await db.get_match_scouting()  # reuse existing function
+    rows = await db.get_match_scouting(scouters=scouters, statuses=statuses, include_data=False)
 
-    filtered = []
-    for r in rows:
-        if scouters and (r["scouter"] not in scouters):
-            continue
-        if statuses and (r["status"] not in [s.value if isinstance(s, enums.StatusType) else s for s in statuses]):
-            continue
-
-        filtered.append({
+    filtered = [
+        {
             "match": r["match"],
             "match_type": r["match_type"],
             "team": r["team"],
@@ -186,36 +187,126 @@ async def admin_filter_matches(
             "scouter": r["scouter"],
             "status": r["status"],
             "last_modified": r["last_modified"],
-        })
+        }
+        for r in rows
+    ]
+
+    # Plain rows: returned as a response so FastAPI skips jsonable_encoder on large lists
+    return ORJSONResponse({"count": len(filtered), "matches": filtered})
 
-    return {"count": len(filtered), "matches": filtered}
 
 
+@router.get("/admin/summary")
+async def admin_event_summary(_: enums.SessionInfo = Depends(db.require_permission("admin"))):
+    """
+    Returns the trigger-maintained per-team (means/variances per phase) and per-match
+    alliance point totals for the current event. Requires admin permission.
+    """
+    return ORJSONResponse(await db.get_event_summary())
+
+
+@router.post("/admin/summary/rebuild")
+async def admin_rebuild_summary(_: enums.SessionInfo = Depends(db.require_permission("admin"))):
+    """Admin-only: recomputes the summary tables from the raw scouting rows."""
+    await db.rebuild_summaries()
+    return {"status": "rebuilt"}
+
+
+@router.get("/admin/analytics")
+async def admin_analytics_status(_: enums.SessionInfo = Depends(db.require_permission("admin"))):
+    """
+    Returns the background analytics worker's state (idle/pending/running), run and
+    failure counts, last error and per-step timings of the last run. Requires admin permission.
+    """
+    return analytics.get_status()
+
+
+@router.post("/admin/analytics/run")
+async def admin_run_analytics(_: enums.SessionInfo = Depends(db.require_permission("admin"))):
+    """Admin-only: starts an analytics run now (skipping the debounce) and returns the worker status without waiting for it."""
+    try:
+        return analytics.run_now()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/admin/coverage", dependencies=[Depends(db.request_connection)])
+async def admin_coverage(_: enums.SessionInfo = Depends(db.require_permission("admin"))):
+    """
+    Returns scouting coverage for the current event: scheduled team slots without a
+    submission, matches the analytics pipeline drops as incomplete, and per-scouter
+    claimed/submitted counts. Requires admin permission.
+    """
+    rows = await db.get_match_scouting(include_data=False)
+    schedule = await db.get_match_schedule()
+    return ORJSONResponse(coverage_report(rows, schedule))
+
+
+@router.get("/admin/validation")
+async def admin_validation(_: enums.SessionInfo = Depends(db.require_permission("admin"))):
+    """
+    Runs the data-quality rules (alliance size, alliance, duplicates, per-level coral caps,
+    impossible values) over the current event's submitted match scouting and returns
+    {"summary": counts per rule/severity, "violations": [...]}. Alliances still missing
+    robots are warnings, since the event may be in progress. Requires admin permission.
+    """
+    rows = await db.get_scouting_counts(statuses=[enums.StatusType.SUBMITTED])
+    violations = validate(frame_from_columns(rows), LIVE_RULES)
+    return ORJSONResponse({"summary": summarize(violations, rows=len(rows)), "violations": violations})
+
+
+@router.get("/admin/metrics/db")
+async def admin_db_metrics(_: enums.SessionInfo = Depends(db.require_permission("admin"))):
+    """
+    Returns connection pool statistics (size, idle, in use, acquire wait and timeouts)
+    for sizing the pool to real load. Requires admin permission.
+    """
+    return {"pools": db.get_pool_metrics()}
 
-@router.get("/team/{team}")
+
+@router.get("/search")
+async def search(
+        request: Request,
+        q: str = Query(..., min_length=1, max_length=64),
+        limit: int = Query(20, ge=1, le=100),
+        _: enums.SessionInfo = Depends(db.require_session()),
+):
+    """
+    Prefix search over the latest analytics index: teams by number or nickname
+    (any word), matches by key (e.g. "qm 1"). Returns {"teams": [...], "matches": [...]}.
+    """
+    index = await search_index.get_search_index(request.app.state.team_data)
+    if index is None:
+        raise HTTPException(status_code=404, detail="No analytics index has been published yet")
+    return ORJSONResponse(index.search(q, limit))
+
+
+@router.get("/team/{team}", dependencies=[Depends(db.request_connection)])
 async def get_team_basic_info(team: int):
     """
-    Returns team number, nickname, rookie year, and whether the team
-    has already been pit-scouted for the current event.
+    Returns team number, nickname, rookie year, logo URL, whether the team has
+    already been pit-scouted, and its precomputed match summary for the current event.
     """
     info = await db.get_team_info(team)
     if not info:
         raise HTTPException(status_code=404, detail="Team not found")
 
     # --- Check if team already scouted ---
-    pit_records = await db.get_pit_scouting(team=team)
+    pit_records = await db.get_pit_scouting(team=team, include_data=False)
     scouted = len(pit_records) > 0
 
     return {
         "number": int(team),
         "nickname": info.get("nickname", f"Team {team}"),
         "rookie_year": info.get("rookie_year", None),
-        "scouted": scouted
+        "logo": tba_fetcher.logo_url(team),
+        "scouted": scouted,
+        "summary": await db.get_team_summary(team),
     }
 
 
 
-@router.patch("/scouting/{m_type}/{match}/{team}/claim")
+@router.patch("/scouting/{m_type}/{match}/{team}/claim", dependencies=[Depends(db.request_connection)])
 async def claim_team(
         m_type: enums.MatchType,
         match: int,
@@ -229,7 +320,7 @@ async def claim_team(
     Fails if already claimed by someone else.
     """
 
-    rows = await db.get_match_scouting(match=match, m_type=m_type, team=team)
+    rows = await db.get_match_scouting(match=match, m_type=m_type, team=team, include_data=False)
     if not rows:
         raise HTTPException(status_code=404, detail="Entry not found")
 
@@ -250,7 +341,7 @@ async def claim_team(
     return {"status": "claimed", "team": team, "scouter": scouter, "phase": "pre"}
 
 
-@router.patch("/scouting/{m_type}/{match}/{team}/unclaim")
+@router.patch("/scouting/{m_type}/{match}/{team}/unclaim", dependencies=[Depends(db.request_connection)])
 async def unclaim_team(
         m_type: enums.MatchType,
         match: int,
@@ -263,7 +354,7 @@ async def unclaim_team(
     Also resets its state to UNCLAIMED.
     """
 
-    rows = await db.get_match_scouting(match=match, m_type=m_type, team=team)
+    rows = await db.get_match_scouting(match=match, m_type=m_type, team=team, include_data=False)
     if not rows:
         raise HTTPException(status_code=404, detail="Entry not found")
     entry = rows[0]
@@ -287,7 +378,7 @@ async def unclaim_team(
     return {"status": "unclaimed", "team": team}
 
 
-@router.patch("/scouting/{m_type}/{match}/{team}/state")
+@router.patch("/scouting/{m_type}/{match}/{team}/state", dependencies=[Depends(db.request_connection)])
 async def update_state(
         m_type: enums.MatchType,
         match: int,
@@ -302,7 +393,7 @@ async def update_state(
     Allows UNCLAIMED → PRE for initialization.
     """
     # --- Fetch entry ---
-    rows = await db.get_match_scouting(match=match, m_type=m_type, team=team)
+    rows = await db.get_match_scouting(match=match, m_type=m_type, team=team, include_data=False)
     if not rows:
         raise HTTPException(status_code=404, detail="Entry not found")
     entry = rows[0]
@@ -355,7 +446,7 @@ async def update_state(
     return {"status": "updated", "team": team, "phase": status}
 
 
-@router.patch("/scouting/{m_type}/{match}/{team}/{scouter}")
+@router.patch("/scouting/{m_type}/{match}/{team}/{scouter}", dependencies=[Depends(db.request_connection)])
 async def update_match(
         match: int,
         team: int,
@@ -365,7 +456,7 @@ async def update_match(
         _: enums.SessionInfo = Depends(db.require_permission("match_scouting")),
 ):
     # Fetch existing row (without scouter to find the current owner)
-    rows = await db.get_match_scouting(match=match, m_type=m_type, team=team)
+    rows = await db.get_match_scouting(match=match, m_type=m_type, team=team, include_data=False)
     if not rows:
         raise HTTPException(status_code=404, detail="Entry not found")
     entry = rows[0]
@@ -409,43 +500,50 @@ async def submit_data(
         match: int,
         team: int,
         full_data: enums.FullData,
+        request: Request,
         _: enums.SessionInfo = Depends(db.require_permission("match_scouting"))
 ):
     data = full_data.model_dump()
     data.pop("alliance", None)
     data.pop("scouter", None)
     data.pop("match_type", None)
+    if request.app.state.config.get("PACK_BRANCH_PLACEMENT"):
+        pack_phases(data)
 
-    # Check if entry exists
-    existing = await db.get_match_scouting(
-        match=match,
-        m_type=m_type,
-        team=team,
-        scouter=full_data.scouter
-    )
-
-    if not existing:
-        # Add it first
-        await db.add_match_scouting(
+    # Create-if-missing and the final update commit together
+    async with db.transaction():
+        # Check if entry exists
+        existing = await db.get_match_scouting(
             match=match,
             m_type=m_type,
             team=team,
-            alliance=full_data.alliance,
             scouter=full_data.scouter,
-            status=enums.StatusType.POST,  # Initial status before submit
-            data={}  # Start with empty data
+            include_data=False,
         )
 
-    # Then update it with the submitted data
-    await db.update_match_scouting(
-        match=match,
-        m_type=m_type,
-        team=team,
-        scouter=full_data.scouter,
-        status=enums.StatusType.SUBMITTED,
-        data=data
-    )
+        if not existing:
+            # Add it first
+            await db.add_match_scouting(
+                match=match,
+                m_type=m_type,
+                team=team,
+                alliance=full_data.alliance,
+                scouter=full_data.scouter,
+                status=enums.StatusType.POST,  # Initial status before submit
+                data={}  # Start with empty data
+            )
+
+        # Then update it with the submitted data
+        await db.update_match_scouting(
+            match=match,
+            m_type=m_type,
+            team=team,
+            scouter=full_data.scouter,
+            status=enums.StatusType.SUBMITTED,
+            data=data
+        )
 
+    analytics.notify_submission()
     return {"status": "submitted"}
 
 
@@ -471,25 +569,26 @@ async def get_match_info(
         team_numbers = [t for t in match_row["blue"] if t is not None]
 
     # Ensure each team has a match_scouting entry
-    for t in team_numbers:
-        existing = await db.get_match_scouting(match=match, m_type=m_type, team=str(t))
-        if not existing:
-            await db.add_match_scouting(
-                match=match,
-                m_type=m_type,
-                team=t,
-                alliance=alliance,
-                scouter=None,
-                status=enums.StatusType.UNCLAIMED,
-                data={}
-            )
+    async with db.transaction():
+        for t in team_numbers:
+            existing = await db.get_match_scouting(match=match, m_type=m_type, team=str(t), include_data=False)
+            if not existing:
+                await db.add_match_scouting(
+                    match=match,
+                    m_type=m_type,
+                    team=t,
+                    alliance=alliance,
+                    scouter=None,
+                    status=enums.StatusType.UNCLAIMED,
+                    data={}
+                )
 
     return {
         "teams": [
             {
                 "number": int(t),
                 "name": f"Team {t}",
-                "scouter": (await db.get_match_scouting(match=match, m_type=m_type, team=t))[0].get("scouter"),
+                "scouter": (await db.get_match_scouting(match=match, m_type=m_type, team=t, include_data=False))[0].get("scouter"),
                 "nickname": (await db.get_team_info(t))["nickname"]
             }
             for t in team_numbers
@@ -504,7 +603,7 @@ async def get_scouter_state(
         alliance: enums.AllianceType,
         _: enums.SessionInfo = Depends(db.require_permission("match_scouting")),
 ):
-    entries = await db.get_match_scouting(match=match, m_type=m_type)
+    entries = await db.get_match_scouting(match=match, m_type=m_type, include_data=False)
     relevant = [e for e in entries if e["alliance"] == alliance.value]
 
     return {
@@ -522,8 +621,8 @@ async def list_pit_teams(
     """
     Lists all teams with pit scouting data for the current event.
     """
-    rows = await db.get_pit_scouting()  # uses metadata.current_event internally
-    return {"teams": [
+    rows = await db.get_pit_scouting(include_data=False)  # uses metadata.current_event internally
+    return ORJSONResponse({"teams": [
         {
             "team": r["team"],
             "scouter": r.get("scouter"),
@@ -531,7 +630,7 @@ async def list_pit_teams(
             "last_modified": r.get("last_modified")
         }
         for r in rows
-    ]}
+    ]})
 
 
 @router.get("/pit/{team}")
@@ -546,16 +645,16 @@ async def get_pit_team(
     if not rows:
         raise HTTPException(status_code=404, detail="No pit scouting entry found")
     entry = rows[0]
-    return {
+    return ORJSONResponse({
         "team": entry["team"],
         "scouter": entry["scouter"],
         "status": entry["status"],
         "data": entry["data"],
         "last_modified": entry["last_modified"],
-    }
+    })
 
 
-@router.post("/pit/{team}")
+@router.post("/pit/{team}", dependencies=[Depends(db.request_connection)])
 async def update_pit_team(
     team: int,
     body: Dict[str, Any] = Body(...),
@@ -564,7 +663,7 @@ async def update_pit_team(
     """
     Creates or updates pit scouting data for a team.
     """
-    existing = await db.get_pit_scouting(team=team)
+    existing = await db.get_pit_scouting(team=team, include_data=False)
     scouter = body.get("scouter")
     status = enums.StatusType(body.get("status", enums.StatusType.PRE.value))
 
@@ -597,26 +696,58 @@ async def submit_pit_data(
     """
     Finalizes pit scouting data for a team and marks it as SUBMITTED.
     """
-    rows = await db.get_pit_scouting(team=team)
-    if not rows:
-        # create entry if missing
-        await db.add_pit_scouting(
+    async with db.transaction():
+        rows = await db.get_pit_scouting(team=team, include_data=False)
+        if not rows:
+            # create entry if missing
+            await db.add_pit_scouting(
+                team=team,
+                scouter=full_data.get("scouter"),
+                status=enums.StatusType.POST,
+                data={}
+            )
+
+        await db.update_pit_scouting(
             team=team,
             scouter=full_data.get("scouter"),
-            status=enums.StatusType.POST,
-            data={}
+            status=enums.StatusType.SUBMITTED,
+            data=full_data.get("data", full_data),
         )
 
-    await db.update_pit_scouting(
-        team=team,
-        scouter=full_data.get("scouter"),
-        status=enums.StatusType.SUBMITTED,
-        data=full_data.get("data", full_data),
-    )
-
     return {"status": "submitted", "team": team}
 
 
+@router.post("/admin/set_event")
+async def set_event(event: str, _: enums.SessionInfo = Depends(db.require_permission("admin"))):
+    """
+    Admin-only: Initializes the scouting database for a given event key.
+    Pulls data from TBA and, in one transaction, writes the event's teams, the match
+    schedule, and an unclaimed record for each team in each match. Safe to re-run.
+    """
+    try:
+        event_data = await tba_fetcher.get_event_data(event)
+        teams = await tba_fetcher.fetch_event_teams(event)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to fetch event data: {str(e)}")
+
+    match_types = {m.value for m in enums.MatchType}
+    matches = [
+        {
+            "match_type": m["comp_level"],
+            "match_number": int(m["match_number"]),
+            "scheduled_time": datetime.fromtimestamp(float(m["actual_time"]), tz=timezone.utc)
+            if m["actual_time"] else None,
+            "red": [int(t[3:]) for t in m["alliances"]["red"]["team_keys"]],
+            "blue": [int(t[3:]) for t in m["alliances"]["blue"]["team_keys"]],
+        }
+        for m in event_data["matches"]
+        if m["comp_level"] in match_types
+    ]
+
+    counts = await db.bootstrap_event(event, matches, teams)
+    return {"status": "event initialized", **counts}
+
+
 '''
 @router.post("/auth/login/guest")
 async def guest_login(request: Request, body: enums.PasscodeBody):
@@ -670,38 +801,6 @@ async def expire_all(_: enums.SessionInfo = Depends(db.require_permission("admin
     return {"status": "all expired"}
 
 
-@router.post("/admin/set_event")
-async def set_event(event: str, _: enums.SessionInfo = Depends(db.require_permission("admin"))):
-    """
-    Admin-only: Initializes the scouting database for a given event key.
-    Pulls data from TBA and creates empty records for each team in each match.
-    """
-    try:
-        matches = tba_fetcher.get_event_data(event)["matches"]
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to fetch event data: {str(e)}")
-
-    # Insert match data into the database using async calls
-    for match in matches:
-        match_key = match["key"].split("_")[-1]  # e.g., qm1
-        for alliance in enums.AllianceType:
-            for team_key in match["alliances"][alliance.value]["team_keys"]:
-                team_number = int(team_key[3:])
-                # Use db.py to insert match scouting data asynchronously
-                await db.add_match_scouting(
-                    match=match_key,
-                    m_type=enums.MatchType.QUALIFIER,  # Assuming match type is "qm" for simplicity
-                    team=team_number,
-                    alliance=alliance,  # Directly using the Enum value
-                    scouter=None,
-                    status=enums.StatusType.UNCLAIMED,
-                    data={}
-                )
-
-    return {"status": "event initialized", "matches": len(matches)}
-
-
-
 @router.get("/data/processed")
 async def get_data_processed(_: enums.SessionInfo = Depends(db.require_permission("admin"))):
     rows = await db.get_processed_data()
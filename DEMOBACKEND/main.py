@@ -8,11 +8,14 @@ from typing import Dict, Any
 from fastapi import FastAPI
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
 from starlette.staticfiles import StaticFiles
 
+import analytics
 import db
 import helpers
 import endpoints
+import tba_fetcher
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -27,7 +30,8 @@ async def lifespan(app: FastAPI):
     app.state.DB_HOST = os.getenv("DB_HOST")
     app.state.DB_PORT = os.getenv("DB_PORT", 5432)
 
-    # Initialize the databases
+    # Initialize the databases (warms min_size pool connections first)
+    await db.init_pool()
     await db.init_data_db()
     await db.init_session_db()
 
@@ -45,19 +49,41 @@ async def lifespan(app: FastAPI):
         "DEFAULT_YEAR": "2025",
         "SESSION_DURATION": timedelta(hours=3),
         "UUID_DURATION": timedelta(days=100),
-        "POLL_TIMEOUT": 10  # seconds
+        "POLL_TIMEOUT": 10,  # seconds
+        # Store submitted branchPlacement as a 36-bit int (calculators/Branch_Bitmask.py)
+        "PACK_BRANCH_PLACEMENT": os.getenv("PACK_BRANCH_PLACEMENT", "false").lower() == "true",
+        # Rebuild the analytics index in a worker process after submissions settle (analytics.py)
+        "ANALYTICS_WORKER": os.getenv("ANALYTICS_WORKER", "true").lower() == "true",
+        "ANALYTICS_DEBOUNCE": float(os.getenv("ANALYTICS_DEBOUNCE", analytics.DEFAULT_DEBOUNCE)),
     }
 
+    if app.state.config["ANALYTICS_WORKER"]:
+        analytics.start_worker(app.state.config["ANALYTICS_DEBOUNCE"])
+
     # Print out the loaded configurations (optional)
     print(f"Team data loaded: {len(team_data)} teams")
 
     yield
 
     print("Shutting down...")
+    await analytics.stop_worker()
+    await tba_fetcher.close_tba_client()
+    await db.close_pool()
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Static files whose names are content hashes, so browsers may cache them forever."""
+
+    def file_response(self, full_path, *args, **kwargs) -> Response:
+        response = super().file_response(full_path, *args, **kwargs)
+        if str(full_path).endswith(".png"):  # the manifest is mutable
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
 
 
 app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory=Path(__file__).parent), name="static")
+app.mount("/logos", ImmutableStaticFiles(directory=tba_fetcher.LOGO_DIR, check_dir=False), name="logos")
 
 with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
     s.connect(("8.8.8.8", 80))  # Connect to a public DNS server to get the local IP
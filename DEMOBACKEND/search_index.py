@@ -0,0 +1,108 @@
+import itertools
+import logging
+import re
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, Optional
+
+import orjson
+
+import db
+
+logger = logging.getLogger(__name__)
+
+_loaded: Optional[tuple[str, Optional["SearchIndex"]]] = None  # (digest, index) of the last load
+
+
+def _normalize(text: str) -> str:
+    """Casefold and collapse whitespace, so "QM  12" finds "qm 12"."""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def _prefix_range(keys: list[tuple[str, str]], prefix: str) -> Iterator[str]:
+    """Ids whose key starts with `prefix`: binary search to the first, then scan while matching."""
+    i = bisect_left(keys, (prefix,))
+    while i < len(keys) and keys[i][0].startswith(prefix):
+        yield keys[i][1]
+        i += 1
+
+
+class SearchIndex:
+    """
+    Prefix lookup over calculator_new.build_search_index output.
+
+    Team numbers, nicknames (whole and from each word) and match keys are kept in sorted
+    (key, id) lists, so a query costs a binary search plus one step per hit.
+    """
+
+    def __init__(self, index: Dict[str, Any], nicknames: Dict[int, str]):
+        self.teams: Dict[str, Dict[str, Any]] = index.get("teams", {})
+        self.matches: Dict[str, Dict[str, Any]] = index.get("matches", {})
+        self.nicknames = {team: nicknames.get(int(team)) if team.isdigit() else None for team in self.teams}
+
+        self._team_keys = sorted((team, team) for team in self.teams)
+        self._nickname_keys = sorted(
+            (" ".join(words[i:]), team)
+            for team, nickname in self.nicknames.items() if nickname
+            for words in [_normalize(nickname).split(" ")]
+            for i in range(len(words))
+        )
+        self._match_keys = sorted((_normalize(key), key) for key in self.matches)
+
+    def search(self, q: str, limit: int = 20) -> Dict[str, list[Dict[str, Any]]]:
+        """Teams matching by number or nickname prefix, and matches by key prefix (at most `limit` each)."""
+        prefix = _normalize(q)
+        teams: list[str] = []
+        for team in itertools.chain(_prefix_range(self._team_keys, prefix), _prefix_range(self._nickname_keys, prefix)):
+            if team not in teams:
+                teams.append(team)
+            if len(teams) == limit:
+                break
+
+        matches = []
+        for key in _prefix_range(self._match_keys, prefix):
+            matches.append({"key": key, **self.matches[key]})
+            if len(matches) == limit:
+                break
+
+        return {
+            "teams": [{"team": t, "nickname": self.nicknames[t], **self.teams[t]} for t in teams],
+            "matches": matches,
+        }
+
+
+async def get_search_index(nicknames: Dict[int, str]) -> Optional[SearchIndex]:
+    """
+    The current event's analytics index (db.get_analytics_index). Each call reads only the
+    published digest; the blob is fetched and parsed again when the digest changes, so every
+    worker process picks up a new index. A blob that isn't a usable index is cached as None
+    under its digest too. None until the analytics worker has published one.
+    """
+    global _loaded
+    digest = await db.get_analytics_index_digest()
+    if digest is None:
+        _loaded = None
+        return None
+    if _loaded is not None and _loaded[0] == digest:
+        return _loaded[1]
+
+    row = await db.get_analytics_index()
+    if row is None:
+        _loaded = None
+        return None
+    data, digest = row
+    try:
+        index = orjson.loads(data)
+    except orjson.JSONDecodeError as e:
+        logger.error("Analytics index is not valid JSON: %s", e)
+        index = None
+    if not isinstance(index, dict) or "teams" not in index:
+        _loaded = (digest, None)
+    else:
+        _loaded = (digest, SearchIndex(index, nicknames))
+    return _loaded[1]
+
+
+def invalidate():
+    """Drop the loaded index in this process; the next lookup reloads it (other processes follow the digest)."""
+    global _loaded
+    _loaded = None
@@ -1,12 +1,17 @@
+import asyncio
 import base64
+import hashlib
+import json
+import logging
 import re
+import time
 
-import requests
+import httpx
 from pathlib import Path
 from datetime import datetime
 import csv
 import os
-from typing import List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any
 from dotenv import load_dotenv
 from functools import lru_cache
 
@@ -14,52 +19,181 @@ load_dotenv()
 
 TBA_BASE_URL: str = "https://www.thebluealliance.com/api/v3"
 AUTH_KEY = os.getenv("TBA_KEY", None)
-HEADERS: Dict[str, str] = {"X-TBA-Auth-Key": AUTH_KEY}
+HEADERS: Dict[str, str] = {"X-TBA-Auth-Key": AUTH_KEY} if AUTH_KEY else {}
 LOGO_DIR = Path("./logos")
+CACHE_DIR = Path("./tba_cache")
 DEFAULT_YEAR = "2025"
+MAX_CONCURRENCY = 16
+NOT_FOUND_MAX_AGE = 24 * 3600  # seconds a 404 is cached (e.g. no media for a team/year)
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_tba_client() -> httpx.AsyncClient:
+    """
+    Return the shared HTTP client, creating it on first use.
+    One keep-alive connection pool is reused for every request. The client carries no
+    auth header: tba_get adds X-TBA-Auth-Key per request, so third-party URLs fetched
+    through it (avatar direct_urls) never see the API key.
+    """
+    global _client, _semaphore
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=TBA_BASE_URL,
+            timeout=httpx.Timeout(15.0),
+            limits=httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY),
+            follow_redirects=True,
+        )
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _client
+
+
+async def close_tba_client():
+    """Close the shared TBA client and its connection pool."""
+    global _client, _semaphore
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _semaphore = None
+
+
+def _max_age(cache_control: Optional[str]) -> int:
+    """Parse max-age (seconds) out of a Cache-Control header, 0 if absent."""
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else 0
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write via a temp file and os.replace, so readers never see a partial file."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _read_cache(cache_path: Path) -> Optional[Dict[str, Any]]:
+    """A cached response, or None if missing or unreadable (an unreadable entry is a cache miss)."""
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or not isinstance(cached.get("expires"), (int, float)) or "body" not in cached:
+        return None
+    return cached
+
+
+async def tba_get(path: str, required: bool = False) -> Optional[Any]:
+    """
+    GET a TBA API path as JSON through the shared pool.
+    Responses are cached on disk; fresh entries (per max-age) skip the network,
+    stale ones are revalidated with If-None-Match / If-Modified-Since. A 404 is cached
+    as None for at least NOT_FOUND_MAX_AGE, so missing media is not probed again.
+    Returns None on a non-200 response unless `required`, which raises instead.
+    """
+    client = get_tba_client()
+    cache_path = CACHE_DIR / f"{hashlib.sha1(path.encode()).hexdigest()}.json"
+    cached = _read_cache(cache_path)
+    if cached and cached["expires"] > time.time():
+        return cached["body"]
+
+    headers: Dict[str, str] = dict(HEADERS)
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+
+    async with _semaphore:
+        r = await client.get(path, headers=headers)
+
+    if r.status_code == 304 and cached:
+        body = cached["body"]
+    elif r.status_code == 200:
+        body = r.json()
+    elif r.status_code == 404 and not required:
+        body = None
+    else:
+        if required:
+            r.raise_for_status()
+        return None
 
+    CACHE_DIR.mkdir(exist_ok=True)
+    _write_atomic(cache_path, json.dumps({
+        "etag": r.headers.get("ETag", cached and cached.get("etag")),
+        "last_modified": r.headers.get("Last-Modified", cached and cached.get("last_modified")),
+        "expires": time.time() + max(_max_age(r.headers.get("Cache-Control")),
+                                     NOT_FOUND_MAX_AGE if r.status_code == 404 else 0),
+        "body": body,
+    }).encode("utf-8"))
+    return body
 
-def fetch_event_matches(event_key: str) -> List[Dict[str, Any]]:
-    url = f"{TBA_BASE_URL}/event/{event_key}/matches"
-    r = requests.get(url, headers=HEADERS)
-    r.raise_for_status()
-    return r.json()
 
+async def fetch_event_matches(event_key: str) -> List[Dict[str, Any]]:
+    return await tba_get(f"/event/{event_key}/matches", required=True)
 
-def resolve_team_logo(team_number: int, year: str = DEFAULT_YEAR) -> str:
-    team_key = f"frc{team_number}"
-    local_path = LOGO_DIR / f"{team_key}.png"
 
-    if local_path.exists():
-        with open(local_path, "rb") as f:
-            encoded = base64.b64encode(f.read()).decode("utf-8")
-        return f"data:image/png;base64,{encoded}"
+async def fetch_event_teams(event_key: str) -> List[Dict[str, Any]]:
+    return await tba_get(f"/event/{event_key}/teams", required=True)
 
-    logo_url, is_base64 = fetch_team_logo(team_key, year)
-    if logo_url is None:
-        return "/assets/logos/default.png"  # fallback to file path
 
-    save_logo(team_key, logo_url, is_base64)
+# =================== Team Logos ===================
+# Logos are stored content-addressed as LOGO_DIR/<sha256>.png; the manifest maps
+# team keys to those files so identical avatars are stored once and URLs never go stale.
+# Responses carry logo_url, never inline base64: main.py serves /logos as immutable
+# static files, so nothing is encoded per request and no in-memory logo cache is kept.
 
-    # Read saved image as base64 after caching
-    with open(local_path, "rb") as f:
-        encoded = base64.b64encode(f.read()).decode("utf-8")
-    return f"data:image/png;base64,{encoded}"
+LOGO_MANIFEST = LOGO_DIR / "manifest.json"
 
+_manifest: Optional[Dict[str, str]] = None
+
+
+def _load_manifest() -> Dict[str, str]:
+    global _manifest
+    if _manifest is None:
+        _manifest = json.loads(LOGO_MANIFEST.read_text(encoding="utf-8")) if LOGO_MANIFEST.exists() else {}
+    return _manifest
+
+
+def store_logo(team_key: str, content: bytes) -> str:
+    """Write logo bytes under their content hash, record them in the manifest and return the file name."""
+    name = f"{hashlib.sha256(content).hexdigest()}.png"
+    LOGO_DIR.mkdir(exist_ok=True)
+    path = LOGO_DIR / name
+    if not path.exists():
+        _write_atomic(path, content)
+
+    manifest = _load_manifest()
+    if manifest.get(team_key) != name:
+        manifest[team_key] = name
+        _write_atomic(LOGO_MANIFEST, json.dumps(manifest, indent=0, sort_keys=True).encode("utf-8"))
+    return name
+
+
+def logo_file(team_number: int | str) -> Optional[Path]:
+    """Return the stored logo file for a team, adopting a legacy LOGO_DIR/frc<n>.png if present."""
+    team_key = f"frc{team_number}"
+    name = _load_manifest().get(team_key)
+    if name is None:
+        legacy = LOGO_DIR / f"{team_key}.png"
+        if not legacy.exists():
+            return None
+        name = store_logo(team_key, legacy.read_bytes())
+    return LOGO_DIR / name
 
-@lru_cache(maxsize=512)
-def resolve_team_logo_cached(team_number: int, year: str = DEFAULT_YEAR) -> str:
-    return resolve_team_logo(team_number, year)
 
+def logo_url(team_number: int | str) -> Optional[str]:
+    """Static URL of a team's logo (served with immutable cache headers), or None if not fetched."""
+    path = logo_file(team_number)
+    return f"/logos/{path.name}" if path else None
 
-def fetch_team_logo(team_key: str, year: str, max_years_back: int = 10) -> (Optional[str], Optional[bool]):
+
+async def fetch_team_logo(team_key: str, year: str, max_years_back: int = 10) -> (Optional[str], Optional[bool]):
     year_int = int(year)
     for y in range(year_int, year_int - max_years_back - 1, -1):
-        url = f"{TBA_BASE_URL}/team/{team_key}/media/{y}"
-        r = requests.get(url, headers=HEADERS)
-        if r.status_code != 200:
+        media: Optional[List[Dict[str, Any]]] = await tba_get(f"/team/{team_key}/media/{y}")
+        if not media:
             continue
-        media: List[Dict[str, Any]] = r.json()
         for item in media:
             if item.get("type") == "avatar" and "base64Image" in item.get("details", {}):
                 return item["details"]["base64Image"], True
@@ -68,24 +202,42 @@ def fetch_team_logo(team_key: str, year: str, max_years_back: int = 10) -> (Opti
     return None, None
 
 
-def save_logo(team_key: str, data: str, is_base64: bool) -> None:
-    LOGO_DIR.mkdir(exist_ok=True)
-    path: Path = LOGO_DIR / f"{team_key}.png"
+async def save_logo(team_key: str, data: str, is_base64: bool) -> None:
     if is_base64:
-        with open(path, "wb") as f:
-            f.write(base64.b64decode(data))
+        store_logo(team_key, base64.b64decode(data.split(",", 1)[-1]))
     else:
-        r = requests.get(data)
+        client = get_tba_client()  # no auth header is sent off TBA
+        async with _semaphore:
+            r = await client.get(data)
         if r.status_code == 200:
-            with open(path, "wb") as f:
-                f.write(r.content)
-
-
-def fetch_team_name(team_key: str) -> Dict[str, Optional[str]]:
-    url = f"{TBA_BASE_URL}/team/{team_key}"
-    r = requests.get(url, headers=HEADERS)
-    r.raise_for_status()
-    team_info: Dict[str, Any] = r.json()
+            store_logo(team_key, r.content)
+
+
+async def prefetch_logos(team_keys: Iterable[str], year: str = DEFAULT_YEAR) -> List[str]:
+    """
+    Fetch and store logos for all teams concurrently. Returns the team keys that have a logo.
+    Teams with a stored logo are not fetched again; a team whose fetch fails is logged and
+    skipped without affecting the others.
+    """
+    async def prefetch(team_key: str) -> Optional[str]:
+        if logo_file(team_key.removeprefix("frc")) is not None:
+            return team_key
+        logo_data, is_base64 = await fetch_team_logo(team_key, year)
+        if not logo_data:
+            return None
+        await save_logo(team_key, logo_data, is_base64)
+        return team_key if team_key in _load_manifest() else None
+
+    team_keys = list(team_keys)
+    fetched = await asyncio.gather(*(prefetch(team_key) for team_key in team_keys), return_exceptions=True)
+    for team_key, result in zip(team_keys, fetched):
+        if isinstance(result, Exception):
+            logger.error("Failed to fetch logo for %s: %s", team_key, result)
+    return [result for result in fetched if isinstance(result, str)]
+
+
+async def fetch_team_name(team_key: str) -> Dict[str, Optional[str]]:
+    team_info: Dict[str, Any] = await tba_get(f"/team/{team_key}", required=True)
     return {
         "team_number": team_info.get("team_number"),
         "nickname": team_info.get("nickname"),
@@ -96,9 +248,13 @@ def fetch_team_name(team_key: str) -> Dict[str, Optional[str]]:
     }
 
 
-@lru_cache(maxsize=512)
-def fetch_team_name_cached(team_key: str) -> dict:
-    return fetch_team_name(team_key)
+_team_names: Dict[str, dict] = {}
+
+
+async def fetch_team_name_cached(team_key: str) -> dict:
+    if team_key not in _team_names:
+        _team_names[team_key] = await fetch_team_name(team_key)
+    return _team_names[team_key]
 
 
 _cached_matches: Dict[str, Dict[int, Dict[str, list[str]]]] = {}
@@ -142,11 +298,10 @@ def get_match_alliance_teams_cached(event_key: str, match_type: str, match_numbe
     return get_match_alliance_teams(event_key, match_type, match_number, alliance)
 
 
-def get_event_data(event_key: str) -> Dict[str, Any]:
+async def get_event_data(event_key: str) -> Dict[str, Any]:
     year = event_key[:4]
     event_csv = Path(f"{event_key}.csv")
     matches: List[Dict[str, Any]] = []
-    logos_downloaded: List[str] = []
     all_teams: set[str] = set()
 
     # If CSV exists, load from it
@@ -173,7 +328,7 @@ def get_event_data(event_key: str) -> Dict[str, Any]:
                 all_teams.update(match["red"] + match["blue"])
     else:
         # Fetch from TBA
-        matches_raw = fetch_event_matches(event_key)
+        matches_raw = await fetch_event_matches(event_key)
         for match in matches_raw:
             match["match_number"] = int(re.search(r"_(?:sf|qm)(\d+)", match["key"]).group(1)) \
                 if "_sf" in match["key"] or "_qm" in match["key"] \
@@ -210,13 +365,7 @@ def get_event_data(event_key: str) -> Dict[str, Any]:
                 all_teams.update(red + blue)
 
     # Cache team logos
-    for team_key in sorted(all_teams):
-        logo_data, is_base64 = fetch_team_logo(team_key, year)
-        if logo_data:
-            if is_base64:
-                logo_data = logo_data.split(",", 1)[-1]
-            save_logo(team_key, logo_data, is_base64)
-            logos_downloaded.append(team_key)
+    logos_downloaded = await prefetch_logos(sorted(all_teams), year)
 
     return {
         "matches": matches,
@@ -224,28 +373,30 @@ def get_event_data(event_key: str) -> Dict[str, Any]:
     }
 
 
-if __name__ == "__main__":
+async def main():
     event_key = "2025caoc"
     year = event_key[:4]
-    data = get_event_data(event_key)
-    print("Match details loaded")
-    matches = data["matches"]
-    logos_downloaded = data["logos_downloaded"]
-
-    print(f"Downloaded {len(logos_downloaded)} logos.")
-    print("Match summary:")
-    for m in matches:
-        t = m.get("actual_time") or m.get("predicted_time") or m.get("time")
-        if t: t = datetime.fromtimestamp(t).isoformat()
-        red = " / ".join(m["alliances"]["red"]["team_keys"])
-        blue = " / ".join(m["alliances"]["blue"]["team_keys"])
-        print(f"{m['comp_level'].upper()} {m['match_number']:>2}: {red} vs {blue} @ {t}")
-
-    # Save team metadata
-    team_info_list = []
-    for team_key in sorted(set(logos_downloaded)):
-        info = fetch_team_name(team_key)
-        team_info_list.append(info)
+    try:
+        data = await get_event_data(event_key)
+        print("Match details loaded")
+        matches = data["matches"]
+        logos_downloaded = data["logos_downloaded"]
+
+        print(f"Downloaded {len(logos_downloaded)} logos.")
+        print("Match summary:")
+        for m in matches:
+            t = m.get("actual_time") or m.get("predicted_time") or m.get("time")
+            if t: t = datetime.fromtimestamp(t).isoformat()
+            red = " / ".join(m["alliances"]["red"]["team_keys"])
+            blue = " / ".join(m["alliances"]["blue"]["team_keys"])
+            print(f"{m['comp_level'].upper()} {m['match_number']:>2}: {red} vs {blue} @ {t}")
+
+        # Save team metadata
+        team_info_list = list(await asyncio.gather(
+            *(fetch_team_name(team_key) for team_key in sorted(set(logos_downloaded)))
+        ))
+    finally:
+        await close_tba_client()
 
     # Write to CSV
     file_exists = os.path.exists("team_info.csv")
@@ -258,3 +409,7 @@ if __name__ == "__main__":
         writer.writerows(team_info_list)
 
     print(f"Saved info for {len(team_info_list)} teams to team_info.csv")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+import numpy as np
+
+from calculators.Branch_Bitmask import (
+    BRANCHES, LANE_BITS, LEVELS, MASK_BITS, decode_branches, encode_branches, level_counts, pack_phases, unpack_bits,
+)
+
+
+def placement(*filled):
+    """branchPlacement dict with the given (branch, level) pairs set."""
+    return {b: {lvl: (b, lvl) in filled for lvl in LEVELS} for b in BRANCHES}
+
+
+def test_bit_layout():
+    assert MASK_BITS == 36
+    assert encode_branches(placement(("A", "l2"))) == 1
+    assert encode_branches(placement(("L", "l2"))) == 1 << 11
+    assert encode_branches(placement(("A", "l3"))) == 1 << LANE_BITS
+    assert encode_branches(placement(("C", "l4"))) == 1 << (2 * LANE_BITS + 2)
+    assert encode_branches(placement(*((b, lvl) for b in BRANCHES for lvl in LEVELS))) == (1 << MASK_BITS) - 1
+
+
+def test_round_trip():
+    rng = np.random.default_rng(39)
+    for mask in [0, (1 << MASK_BITS) - 1, *rng.integers(0, 1 << MASK_BITS, 50).tolist()]:
+        decoded = decode_branches(mask)
+        assert list(decoded) == list(BRANCHES)
+        assert encode_branches(decoded) == mask
+
+
+def test_encode_ignores_unknown_and_malformed_entries():
+    assert encode_branches({"A": {"l2": True, "l1": True}, "B": True, "Z": {"l4": True}}) == 1
+    assert encode_branches({}) == 0
+    assert encode_branches(5) == 5  # packed ints pass through
+    assert decode_branches({"A": {}}) == {"A": {}}
+
+
+def test_level_counts():
+    assert level_counts(placement(("A", "l2"), ("B", "l2"), ("K", "l4"))) == {"l2": 2, "l3": 0, "l4": 1}
+    assert level_counts(None) == {"l2": 0, "l3": 0, "l4": 0}
+    assert level_counts((1 << MASK_BITS) - 1) == {lvl: LANE_BITS for lvl in LEVELS}
+
+
+def test_unpack_bits_indexes_level_then_branch():
+    masks = np.array([encode_branches(placement(("D", "l3"))), 0, (1 << MASK_BITS) - 1])
+    bits = unpack_bits(masks)
+    assert bits.shape == (3, len(LEVELS), LANE_BITS)
+    assert bits[0].sum() == 1 and bits[0, 1, BRANCHES.index("D")]
+    assert not bits[1].any()
+    assert bits[2].all()
+
+
+def test_pack_phases():
+    data = {"auto": {"branchPlacement": placement(("A", "l4"))}, "teleop": {"l1": 2}, "postmatch": {}}
+    assert pack_phases(data) is data
+    assert data["auto"]["branchPlacement"] == 1 << (2 * LANE_BITS)
+    assert data["teleop"] == {"l1": 2}
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from calculators.Match_Coverage import MATCH_TYPES, _encode_types, complete_match_mask, coverage_report, match_types
+
+
+def alliance_rows(match_type, match, alliance, teams, status="submitted"):
+    return [{"match_type": match_type, "match": match, "team": t, "alliance": alliance,
+             "scouter": f"s{t}", "status": status} for t in teams]
+
+
+def full_match(match_type, match, first_team):
+    return (alliance_rows(match_type, match, "red", range(first_team, first_team + 3))
+            + alliance_rows(match_type, match, "blue", range(first_team + 3, first_team + 6)))
+
+
+def test_match_types_appends_unknown_types_sorted():
+    assert match_types(pd.Series(["qm", "sf"])) == MATCH_TYPES
+    assert match_types(pd.Series(["qm", "qf", None]), pd.Series(["pr", "qf"])) == MATCH_TYPES + ("pr", "qf")
+
+
+def test_encode_types_keeps_unknown_types_distinct():
+    types = match_types(pd.Series(["qf", "pr"]))
+    codes = _encode_types(pd.Series(["qm", "qf", "pr", None]), types)
+    assert codes.tolist() == [0, types.index("qf"), types.index("pr"), -1]
+
+
+def test_complete_match_mask_does_not_merge_unknown_types():
+    # Half of match 1 as "qf" and half as "pr": neither is complete
+    rows = alliance_rows("qf", 1, "red", [1, 2, 3]) + alliance_rows("pr", 1, "blue", [4, 5, 6]) + full_match("qm", 1, 10)
+    assert complete_match_mask(rows).tolist() == [False] * 6 + [True] * 6
+
+
+def test_coverage_report_labels_unknown_types():
+    rows = full_match("qm", 1, 10) + alliance_rows("qf", 2, "red", [1, 2, 3]) + alliance_rows("pr", 2, "red", [4])
+    schedule = [
+        {"match_type": "qm", "match_number": 1, **{f"red{i}": 9 + i for i in (1, 2, 3)},
+         **{f"blue{i}": 12 + i for i in (1, 2, 3)}},
+        {"match_type": "qf", "match_number": 2, "red1": 1, "red2": 2, "red3": 3, "blue1": 7, "blue2": 8, "blue3": None},
+    ]
+    report = coverage_report(rows, schedule)
+
+    assert report["missing"] == [{"match_type": "qf", "match": 2, "key": "qf 2", "red": [], "blue": [7, 8]}]
+    assert [(m["key"], m["red"], m["blue"]) for m in report["incomplete"]] == [("pr 2", 1, 0), ("qf 2", 3, 0)]
+    assert report["summary"] == {
+        "scheduled_matches": 2, "complete_matches": 1, "slots": 11, "submitted_slots": 9,
+        "coverage": 0.818, "unclaimed_rows": 0,
+    }
+
+
+def test_coverage_report_without_schedule_or_match_type():
+    rows = full_match("qm", 3, 20) + alliance_rows(None, 4, "red", [1], status="post")
+    report = coverage_report(rows)
+    assert report["missing"] == []
+    assert report["summary"]["complete_matches"] == 1
+    assert report["summary"]["slots"] == report["summary"]["submitted_slots"] == 6
+    assert {s["scouter"]: s["completion"] for s in report["scouters"]}["s1"] == 0.0
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from calculators.Branch_Bitmask import BRANCHES, LEVELS, MASK_BITS, encode_branches
+from calculators.Scoring_Habits import PHASES, compute_habits, phase_masks, placement_counts
+
+
+def placement(*filled):
+    return {b: {lvl: (b, lvl) in filled for lvl in LEVELS} for b in BRANCHES}
+
+
+def row(team, auto=None, teleop=None):
+    return {"team": team, "data": {"auto": {"branchPlacement": auto}, "teleop": {"branchPlacement": teleop}}}
+
+
+def test_phase_masks_matches_encode_branches():
+    rng = np.random.default_rng(47)
+    placements = [
+        {b: {lvl: bool(rng.integers(2)) for lvl in LEVELS} for b in BRANCHES if rng.integers(2)}
+        for _ in range(40)
+    ]
+    masks, reported = phase_masks(placements)
+    assert masks.tolist() == [encode_branches(p) for p in placements]
+    assert reported.tolist() == [bool(p) for p in placements]
+
+
+@pytest.mark.parametrize("value, mask, reported", [
+    ({}, 0, False),
+    (None, 0, False),
+    (True, 0, False),
+    ("A", 0, False),
+    (5, 5, True),
+    ((1 << MASK_BITS) - 1, (1 << MASK_BITS) - 1, True),
+    (-1, 0, False),
+    (1 << MASK_BITS, 0, False),
+    (1 << 70, 0, False),
+    ({"A": {"l2": 1, "l3": None}, "B": True, "Z": {"l2": True}}, 1, True),
+])
+def test_phase_masks_values(value, mask, reported):
+    masks, flags = phase_masks([value, {"L": {"l4": True}}])
+    assert masks.tolist() == [mask, encode_branches({"L": {"l4": True}})]
+    assert flags.tolist() == [reported, True]
+
+
+def test_placement_counts_from_dicts_and_generated_columns():
+    rows = [
+        row(1, placement(("A", "l2")), placement(("A", "l2"), ("B", "l4"))),
+        row(1, encode_branches(placement(("A", "l2"))), None),
+        row(2, {}, {}),  # nothing reported: team 2 is left out
+        row(3, None, placement(("L", "l3"))),
+    ]
+    teams, counts = placement_counts(rows)
+    assert list(teams) == ["1", "3"]
+    assert counts.shape == (2, len(PHASES), len(LEVELS), len(BRANCHES))
+    assert counts[0, 0, 0, 0] == 2 and counts[0, 1, 0, 0] == 1 and counts[0, 1, 2, 1] == 1
+    assert counts[0].sum() == 4
+    assert counts[1, 1, 1, 11] == 1 and counts[1].sum() == 1
+
+    packed = [{"team": r["team"], **{f"{p}_branch_mask": encode_branches(r["data"][p]["branchPlacement"] or {}) or None
+                                     for p in PHASES}} for r in rows]
+    packed_teams, packed_counts = placement_counts(packed)
+    assert list(packed_teams) == list(teams)
+    assert (packed_counts == counts).all()
+
+
+def test_compute_habits():
+    habits = compute_habits([
+        row(254, placement(("A", "l4")), placement(("A", "l4"), ("B", "l2"), ("A", "l2"))),
+    ])
+    assert habits["254"]["position_preference"] == [("A", 3), ("B", 1)]
+    assert habits["254"]["accuracy_by_level"] == {"l2": 0.5, "l4": 0.5}
+    assert habits["254"]["phases"]["auto"] == {"position_preference": [("A", 1)], "accuracy_by_level": {"l4": 1.0}}
+    assert compute_habits([]) == {}
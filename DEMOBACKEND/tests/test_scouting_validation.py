@@ -0,0 +1,91 @@
+import pandas as pd
+
+from calculators.Scouting_Validation import (
+    LIVE_RULES, frame_from_columns, frame_from_csv, frame_from_rows, summarize, validate,
+)
+
+
+def entry(match, team, alliance, **counts):
+    return {"match_type": "qm", "match": match, "team": team, "alliance": alliance, "scouter": f"s{team}", **counts}
+
+
+def full_match(match, **counts):
+    return [entry(match, t, "red" if t < 4 else "blue", **counts) for t in range(1, 7)]
+
+
+def rules(violations):
+    return [(v["rule"], v["severity"], v["alliance"], v["team"]) for v in violations]
+
+
+def test_complete_match_is_clean():
+    assert validate(frame_from_columns(full_match(1, teleop_l4=2))) == []
+    assert validate(frame_from_columns([])) == []
+
+
+def test_alliance_size_is_an_error_unless_live():
+    rows = full_match(1)[:5] + [entry(1, 7, "red")]  # red 4, blue 2
+    assert rules(validate(frame_from_columns(rows))) == [
+        ("alliance_size", "error", "blue", None), ("alliance_size", "error", "red", None),
+    ]
+    assert rules(validate(frame_from_columns(rows), LIVE_RULES)) == [
+        ("alliance_size", "warning", "blue", None), ("alliance_size", "error", "red", None),
+    ]
+
+
+def test_missing_alliance_counts_as_zero_teams():
+    violations = validate(frame_from_columns(full_match(1)[:3]))
+    assert [(v["alliance"], v["detail"]) for v in violations] == [("blue", "0 teams (expected 3)")]
+
+
+def test_duplicates():
+    rows = full_match(1) + [entry(1, 1, "red"), entry(1, 2, "blue")]
+    violations = [v for v in validate(frame_from_columns(rows)) if v["rule"] != "alliance_size"]
+    assert rules(violations) == [
+        ("duplicate_entry", "warning", "red", 1), ("duplicate_team", "error", None, 2),
+    ]
+
+
+def test_level_cap_sums_auto_and_teleop_per_alliance():
+    rows = full_match(1, auto_l4=2, teleop_l4=2, teleop_l3=1)  # red and blue each place 12 L4, 3 L3
+    assert validate(frame_from_columns(rows)) == []
+    rows[0]["auto_l4"] = 3
+    assert [(v["alliance"], v["detail"]) for v in validate(frame_from_columns(rows))] == [("red", "L4: 13 coral (max 12)")]
+
+
+def test_impossible_values():
+    rows = full_match(1)
+    rows[0] |= {"teleop_l1": -1}
+    rows[4] |= {"auto_processor": 1.5, "teleop_l2": 13}
+    assert [(v["team"], v["detail"]) for v in validate(frame_from_columns(rows)) if v["rule"] == "impossible_value"] == [
+        (1, "teleop_l1 = -1"), (5, "auto_processor = 1.5"), (5, "teleop_l2 = 13"),
+    ]
+
+
+def test_frame_from_csv_flags_missing_or_unknown_alliance():
+    df = pd.DataFrame({
+        "Pre Match.match_num": [1] * 6,
+        "Pre Match.teamNum": range(1, 7),
+        "Pre Match.allianceColor": ["Red", "red", "RED", "Blue", "blue", None],
+        "Pre Match.match_type": ["Qualification"] * 6,
+    })
+    frame = frame_from_csv(df)
+    assert frame["alliance"].tolist()[:5] == ["red", "red", "red", "blue", "blue"]
+    assert pd.isna(frame["alliance"].iloc[5])
+    assert frame["match_type"].unique().tolist() == ["qm"]
+    assert rules(validate(frame)) == [("alliance", "error", None, 6), ("alliance_size", "error", "blue", None)]
+    assert rules(validate(frame_from_columns([entry(1, 1, "green")])))[0] == ("alliance", "error", "green", 1)
+
+
+def test_frame_from_rows_reads_branch_placements():
+    rows = [{**entry(1, 1, "red"), "data": {"auto": {"branchPlacement": {"A": {"l4": True}, "B": {"l4": True}}, "l1": 1},
+                                           "teleop": {"branchPlacement": 1 << 24, "barge": 2}}}]
+    frame = frame_from_rows(rows)
+    assert frame.loc[0, ["auto_l4", "teleop_l4", "auto_l1", "teleop_barge"]].tolist() == [2, 1, 1, 2]
+    assert pd.isna(frame.loc[0, "teleop_processor"])
+
+
+def test_summarize():
+    violations = validate(frame_from_columns(full_match(1)[:5]), LIVE_RULES)
+    assert summarize(violations, rows=5) == {
+        "rows": 5, "violations": 1, "by_rule": {"alliance_size": 1}, "by_severity": {"warning": 1},
+    }
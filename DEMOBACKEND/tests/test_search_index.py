@@ -0,0 +1,38 @@
+from search_index import SearchIndex, _normalize, _prefix_range
+
+INDEX = {
+    "teams": {"254": {"epa": 1}, "2540": {"epa": 2}, "25": {"epa": 3}, "1678": {"epa": 4}},
+    "matches": {"qm 1": {"red": []}, "qm 12": {"red": []}, "qm 2": {"red": []}, "sf 1": {"red": []}},
+}
+NICKNAMES = {254: "The Cheesy Poofs", 1678: "Citrus Circuits", 25: "Raider Robotix"}
+
+
+def test_prefix_range_returns_every_key_with_the_prefix():
+    keys = sorted([("ab", "1"), ("abc", "2"), ("abd", "3"), ("b", "4"), ("a", "5")])
+    assert list(_prefix_range(keys, "ab")) == ["1", "2", "3"]
+    assert list(_prefix_range(keys, "a")) == ["5", "1", "2", "3"]
+    assert list(_prefix_range(keys, "abz")) == []
+    assert list(_prefix_range(keys, "zz")) == []
+    assert list(_prefix_range(keys, "")) == ["5", "1", "2", "3", "4"]
+    assert list(_prefix_range([], "a")) == []
+
+
+def test_normalize():
+    assert _normalize("  QM \t 12 ") == "qm 12"
+
+
+def test_search_teams_by_number_and_nickname_word():
+    index = SearchIndex(INDEX, NICKNAMES)
+    assert [t["team"] for t in index.search("25")["teams"]] == ["25", "254", "2540"]
+    assert [t["team"] for t in index.search("cheesy")["teams"]] == ["254"]
+    assert [t["team"] for t in index.search("C")["teams"]] == ["254", "1678"]  # "cheesy poofs" < "circuits" < "citrus ..."
+    hit = index.search("poofs")["teams"][0]
+    assert hit == {"team": "254", "nickname": "The Cheesy Poofs", "epa": 1}
+
+
+def test_search_matches_and_limit():
+    index = SearchIndex(INDEX, NICKNAMES)
+    assert [m["key"] for m in index.search("QM 1")["matches"]] == ["qm 1", "qm 12"]
+    assert [m["key"] for m in index.search("qm", limit=2)["matches"]] == ["qm 1", "qm 12"]
+    assert len(index.search("2", limit=1)["teams"]) == 1
+    assert index.search("nothing") == {"teams": [], "matches": []}
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from calculators.Theil_Sen_Estimator import theil_sen_batch, theil_sen_estimator
+
+
+def scalar_theil_sen(y, x=None):
+    """The original pure-Python estimator the vectorized version replaced."""
+    if x is None:
+        x = list(range(len(y)))
+    slopes = [(y[j] - y[i]) / (x[j] - x[i])
+              for i in range(len(x)) for j in range(i + 1, len(x)) if x[j] != x[i]]
+    if not slopes:
+        return None
+
+    def median(data):
+        s = sorted(data)
+        mid = len(s) // 2
+        return 0.5 * (s[mid - 1] + s[mid]) if len(s) % 2 == 0 else s[mid]
+
+    slope = median(slopes)
+    return slope, median([y[i] - slope * x[i] for i in range(len(x))])
+
+
+def test_batch_matches_scalar_estimator():
+    rng = random.Random(28)
+    ys, xs = {}, {}
+    for team in range(60):
+        n = rng.randint(2, 14)
+        ys[f"frc{team}"] = [rng.uniform(0, 80) for _ in range(n)]
+        if team % 3 == 0:  # explicit x with repeated values
+            xs[f"frc{team}"] = [rng.randint(0, 5) for _ in range(n)]
+
+    fits = theil_sen_batch(ys, xs)
+
+    for key, y in ys.items():
+        expected = scalar_theil_sen(y, xs.get(key))
+        if expected is None:
+            assert key not in fits
+        else:
+            assert fits[key] == pytest.approx(expected)
+
+
+def test_batch_skips_short_and_vertical_series():
+    fits = theil_sen_batch({"empty": [], "one": [4.0], "vertical": [1.0, 2.0, 3.0], "line": [1.0, 3.0]},
+                           {"vertical": [2, 2, 2]})
+    assert fits == {"line": pytest.approx((2.0, 1.0))}
+    assert theil_sen_batch({"one": [1.0]}) == {}
+
+
+def test_batch_rejects_mismatched_x():
+    with pytest.raises(ValueError):
+        theil_sen_batch({"a": [1.0, 2.0, 3.0]}, {"a": [0, 1]})
+
+
+def test_scalar_estimator():
+    y = [1.0, 3.0, 5.0, 7.0, 100.0]
+    assert theil_sen_estimator(y) == pytest.approx(scalar_theil_sen(y))
+    assert theil_sen_estimator(y)[0] == pytest.approx(2.0)  # robust to the outlier
+    with pytest.raises(ValueError):
+        theil_sen_estimator([1.0])
+    with pytest.raises(ValueError):
+        theil_sen_estimator([1.0, 2.0], [3, 3])
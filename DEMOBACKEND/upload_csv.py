@@ -1,9 +1,12 @@
+import argparse
+import io
 import os
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import time
+from typing import Callable, Optional
 import pandas as pd
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 from urllib.parse import urlparse
 
 
@@ -24,77 +27,162 @@ def get_conn_from_env():
     )
 
 
-def upload_csv_to_neon():
-    file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
-    if not file_path:
-        return
-
-    try:
-        df = pd.read_csv(file_path)
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to read CSV:\n{e}")
-        return
-
-    table_name = table_entry.get().strip()
-    if not table_name:
-        messagebox.showwarning("Input Error", "Enter a table name first.")
-        return
-
+def get_table_columns(cur, table_name: str) -> list[str]:
+    """Return the table's writable columns from information_schema, in table order (generated columns are skipped)."""
+    cur.execute(
+        sql.SQL(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = %s AND is_generated = 'NEVER' ORDER BY ordinal_position"
+        ),
+        [table_name],
+    )
+    table_cols = [row[0] for row in cur.fetchall()]
+    if not table_cols:
+        raise ValueError(f"Table '{table_name}' does not exist or is not accessible.")
+    return table_cols
+
+
+def print_progress(rows: int, elapsed: float):
+    print(f"  ↳ {rows} rows uploaded ({rows / elapsed if elapsed else 0:.0f} rows/s)")
+
+
+def upload_csv(
+    file_path: str,
+    table_name: str,
+    conflict_columns: Optional[list[str]] = None,
+    update_on_conflict: bool = True,
+    method: str = "copy",
+    chunk_size: int = 10_000,
+    on_progress: Callable[[int, float], None] = print_progress,
+) -> int:
+    """
+    Stream a CSV into a table chunk by chunk without loading the whole file.
+    Columns are aligned against information_schema: missing columns are sent as
+    NULL and columns the table doesn't have are dropped.
+
+    method="copy" streams each chunk through COPY ... FROM STDIN; method="values"
+    falls back to batched execute_values inserts.
+    With conflict_columns, rows are staged in a temp table and upserted on those
+    columns (DO UPDATE, or DO NOTHING when update_on_conflict is False).
+    Everything runs in one transaction. Returns the number of rows read.
+    """
+    conn = get_conn_from_env()
+    cur = conn.cursor()
     try:
-        conn = get_conn_from_env()
-        cur = conn.cursor()
-
-        # Get table columns from Neon
-        cur.execute(
-            sql.SQL("SELECT column_name FROM information_schema.columns WHERE table_name = %s"),
-            [table_name],
-        )
-        table_cols = [row[0] for row in cur.fetchall()]
-
-        if not table_cols:
-            raise ValueError(f"Table '{table_name}' does not exist or is not accessible.")
-
-        # Align DataFrame columns to table columns
-        missing = [c for c in table_cols if c not in df.columns]
-        for c in missing:
-            df[c] = None  # fill missing with NULL
-
-        # Only keep columns that exist in table
-        df = df[table_cols]
-
-        # Insert data
-        placeholders = ", ".join(["%s"] * len(table_cols))
-        insert_query = sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
-            sql.Identifier(table_name),
-            sql.SQL(", ").join(map(sql.Identifier, table_cols)),
-            sql.SQL(placeholders),
-        )
-
-        for _, row in df.iterrows():
-            cur.execute(insert_query, tuple(row))
+        table_cols = get_table_columns(cur, table_name)
+        target = sql.Identifier(table_name)
+
+        if conflict_columns:
+            target = sql.Identifier(f"{table_name}_upload_stage")
+            cur.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP").format(
+                target, sql.Identifier(table_name)))
+
+        col_list = sql.SQL(", ").join(map(sql.Identifier, table_cols))
+        copy_query = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(target, col_list)
+        insert_query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(target, col_list)
+
+        rows = 0
+        start = time.perf_counter()
+        # dtype=str passes values through as written, so COPY never sees "3.0" for an integer column
+        for chunk in pd.read_csv(file_path, dtype=str, chunksize=chunk_size):
+            # Align chunk columns to table columns, filling missing with NULL
+            chunk = chunk.reindex(columns=table_cols)
+
+            if method == "copy":
+                buf = io.StringIO()
+                chunk.to_csv(buf, index=False, header=False)
+                buf.seek(0)
+                cur.copy_expert(copy_query.as_string(conn), buf)
+            else:
+                values = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+                execute_values(cur, insert_query.as_string(conn), values, page_size=1000)
+
+            rows += len(chunk)
+            on_progress(rows, time.perf_counter() - start)
+
+        if conflict_columns:
+            updates = [c for c in table_cols if c not in conflict_columns]
+            if update_on_conflict and updates:
+                action = sql.SQL("DO UPDATE SET {}").format(sql.SQL(", ").join(
+                    sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in updates))
+            else:
+                action = sql.SQL("DO NOTHING")
+            cur.execute(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} ON CONFLICT ({}) {}").format(
+                sql.Identifier(table_name), col_list, col_list, target,
+                sql.SQL(", ").join(map(sql.Identifier, conflict_columns)), action))
 
         conn.commit()
-        messagebox.showinfo("Success", f"Inserted {len(df)} rows into '{table_name}'.")
-    except Exception as e:
-        if 'conn' in locals():
-            conn.rollback()
-        messagebox.showerror("Error", str(e))
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
     finally:
-        if 'cur' in locals():
-            cur.close()
-        if 'conn' in locals():
-            conn.close()
+        cur.close()
+        conn.close()
 
 
 # --- GUI setup ---
-root = tk.Tk()
-root.title("Upload CSV to Neon")
-root.geometry("420x220")
-
-tk.Label(root, text="Target Table Name:").pack(pady=5)
-table_entry = tk.Entry(root, width=45)
-table_entry.pack()
+def run_gui():
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+
+    def upload_csv_to_neon():
+        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
+        if not file_path:
+            return
+
+        table_name = table_entry.get().strip()
+        if not table_name:
+            messagebox.showwarning("Input Error", "Enter a table name first.")
+            return
+
+        try:
+            rows = upload_csv(file_path, table_name)
+            messagebox.showinfo("Success", f"Inserted {rows} rows into '{table_name}'.")
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    root = tk.Tk()
+    root.title("Upload CSV to Neon")
+    root.geometry("420x220")
+
+    tk.Label(root, text="Target Table Name:").pack(pady=5)
+    table_entry = tk.Entry(root, width=45)
+    table_entry.pack()
+
+    tk.Button(root, text="Select CSV and Upload", command=upload_csv_to_neon).pack(pady=25)
+
+    root.mainloop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload a CSV to Neon. Opens the GUI when no CSV is given.")
+    parser.add_argument("csv", nargs="?", help="CSV file to upload (headless mode)")
+    parser.add_argument("table", nargs="?", help="Target table name")
+    parser.add_argument("--upsert", metavar="COLS", help="Comma-separated conflict columns to upsert on")
+    parser.add_argument("--skip-existing", action="store_true", help="With --upsert, keep existing rows (DO NOTHING)")
+    parser.add_argument("--method", choices=["copy", "values"], default="copy", help="COPY (default) or execute_values")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    if args.csv is None:
+        run_gui()
+        return
+    if args.table is None:
+        parser.error("table is required in headless mode")
+
+    start = time.perf_counter()
+    rows = upload_csv(
+        args.csv,
+        args.table,
+        conflict_columns=args.upsert.split(",") if args.upsert else None,
+        update_on_conflict=not args.skip_existing,
+        method=args.method,
+        chunk_size=args.chunk_size,
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Inserted {rows} rows into '{args.table}' in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s).")
 
-tk.Button(root, text="Select CSV and Upload", command=upload_csv_to_neon).pack(pady=25)
 
-root.mainloop()
+if __name__ == "__main__":
+    main()